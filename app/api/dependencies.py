@@ -2,16 +2,55 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from sqlalchemy.orm import make_transient_to_detached
+import time
+from typing import Any, Dict, Optional, Tuple
 
 from app.db.session import get_db
 from app.db.models import User
 from app.core import security
+from app.core.config import settings
 from app.crud.user import crud_user
 
 # Security scheme
 security_bearer = HTTPBearer(auto_error=False)
 
+# username -> (expires_at, column values); bounded by TTL and size
+_USER_CACHE_MAX_ENTRIES = 10_000
+_user_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def invalidate_cached_user(username: str) -> None:
+    """Drop a cached user row (call after changing it)"""
+    _user_cache.pop(username, None)
+
+
+async def _get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """
+    crud_user.get_by_username with a short-lived in-process cache.
+    Cached rows are re-attached to the request session without a SELECT,
+    so endpoints can still modify and commit current_user.
+    """
+    ttl = float(getattr(settings, "AUTH_USER_CACHE_TTL_SECONDS", 0.0) or 0.0)
+    if ttl <= 0:
+        return await crud_user.get_by_username(db, username=username)
+
+    now = time.monotonic()
+    entry = _user_cache.get(username)
+    if entry is not None and entry[0] > now:
+        cached = User(**entry[1])
+        make_transient_to_detached(cached)
+        return await db.merge(cached, load=False)
+
+    user = await crud_user.get_by_username(db, username=username)
+    if user is None:
+        _user_cache.pop(username, None)
+        return None
+    if len(_user_cache) >= _USER_CACHE_MAX_ENTRIES:
+        _user_cache.pop(next(iter(_user_cache)))
+    _user_cache[username] = (now + ttl, {c.key: getattr(user, c.key) for c in User.__table__.columns})
+    return user
+
 
 async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security_bearer),
@@ -38,16 +77,11 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    username: str = payload.get("sub")
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # decode_access_token already guarantees a string "sub" claim
+    username: str = payload["sub"]
 
     # Get user from database
-    user = await crud_user.get_by_username(db, username=username)
+    user = await _get_user_by_username(db, username)
     if user is None:
         # ИСПРАВЛЕНО: 401 вместо 404 для консистентности
         raise HTTPException(
@@ -5,7 +5,7 @@ from datetime import timedelta
 
 from app.db.session import get_db
 from app.schemas import UserCreate, UserResponse, UserLogin, Token, PasswordChange, PasswordChangeResponse
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user, invalidate_cached_user
 from app.core import security
 from app.crud import crud_user
 from app.db.models import User
@@ -19,15 +19,14 @@ async def register(
         db: AsyncSession = Depends(get_db)
 ):
     """Register new user"""
-    user = await crud_user.get_by_email(db, email=user_in.email)
-    if user:
+    existing = await crud_user.get_by_username_or_email(db, username=user_in.username, email=user_in.email)
+    if any(user.email == user_in.email for user in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    user = await crud_user.get_by_username(db, username=user_in.username)
-    if user:
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -73,13 +72,14 @@ async def change_password(
         current_user: User = Depends(get_current_user)
 ):
     """Change user password"""
-    if not security.verify_password(password_data.old_password, current_user.password_hash):
+    if not await security.verify_password_async(password_data.old_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect password"
         )
 
-    current_user.password_hash = security.get_password_hash(password_data.new_password)
+    current_user.password_hash = await security.get_password_hash_async(password_data.new_password)
     await db.commit()
+    invalidate_cached_user(current_user.username)
 
     return {"message": "Password updated successfully"}
@@ -25,7 +25,7 @@ from app.db.models.file import File as FileModel
 from app.db.models.file_processing import FileProcessingProfile
 from app.db.session import get_db
 from app.observability.file_lifecycle import log_file_lifecycle_event
-from app.rag.vector_store import VectorStoreManager
+from app.rag.vector_store import get_vectorstore_manager
 from app.schemas.file import (
     FileAttachRequest,
     FileAttachResponse,
@@ -861,7 +861,7 @@ async def delete_file(
     await crud_file.remove_file_from_all_conversations(db, file_id=file_obj.id)
 
     try:
-        VectorStoreManager().delete_by_metadata({"file_id": str(file_obj.id)})
+        await get_vectorstore_manager().adelete_by_metadata({"file_id": str(file_obj.id)})
     except Exception:
         logger.warning("Vector cleanup failed for file_id=%s", file_obj.id, exc_info=True)
 
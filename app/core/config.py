@@ -18,6 +18,8 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = Field(...)
     JWT_ALGORITHM: str = Field(default="HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=10080, ge=1)
+    # In-process cache of authenticated users' rows (per username); 0 disables.
+    AUTH_USER_CACHE_TTL_SECONDS: float = Field(default=30.0, ge=0.0, le=3600.0)
 
     password_min_length: int = Field(default=8, ge=4)
     allowed_origins: str = Field(default="http://localhost:8000,http://127.0.0.1:8000")
@@ -81,6 +83,18 @@ class Settings(BaseSettings):
     # VectorStore / RAG
     VECTORDB_PATH: str = Field(default="runtime/vector/chromadb")
     VECTORDB_EPHEMERAL_MODE: bool = Field(default=False)
+    # Matryoshka prefix index: 0 disables; N > 0 indexes embedding[:N] next to the full vector.
+    VECTORDB_MRL_INDEX_DIM: int = Field(default=0, ge=0)
+    VECTORDB_MRL_OVERSAMPLE: int = Field(default=4, ge=1, le=50)
+    # HNSW build/search parameters for newly created collections; 0 keeps Chroma's default.
+    VECTORDB_HNSW_M: int = Field(default=0, ge=0, le=128)
+    VECTORDB_HNSW_CONSTRUCTION_EF: int = Field(default=0, ge=0, le=2000)
+    VECTORDB_HNSW_SEARCH_EF: int = Field(default=0, ge=0, le=2000)
+    # In-process LRU of recent VectorStoreManager.query() results; size 0 disables.
+    VECTORDB_QUERY_CACHE_SIZE: int = Field(default=256, ge=0, le=100000)
+    VECTORDB_QUERY_CACHE_TTL_SECONDS: float = Field(default=30.0, ge=0.0, le=3600.0)
+    VECTORDB_SEMANTIC_CACHE_THRESHOLD: float = Field(default=0.0, ge=0.0, le=1.0)
+    VECTORDB_SEARCH_WORKERS: int = Field(default=0, ge=0, le=64)
     COLLECTION_NAME: str = Field(default="documents")
     EMBEDDINGS_MODEL: str = Field(default="nomic-embed-text:latest")
     OLLAMA_CHAT_MODEL: str = Field(default="llama3.2:latest")
@@ -94,6 +108,8 @@ class Settings(BaseSettings):
     OLLAMA_EMBED_SEGMENT_OVERLAP_CHARS: int = Field(default=250, ge=0, le=10000)
     EMBEDDING_MODEL_DIMENSIONS: str = Field(default="aihub:qwen3-emb=4096")
     EMBEDDINGS_DIM: int = Field(default=0, ge=0)
+    EMBEDDINGS_QUERY_CACHE_SIZE: int = Field(default=512, ge=0, le=100000)
+    EMBEDDINGS_QUERY_CACHE_TTL_SECONDS: float = Field(default=300.0, ge=0.0, le=86400.0)
 
     EMBEDDINGS_BASEURL: AnyUrl = Field(default="http://localhost:11434")
     CHUNK_SIZE: int = Field(default=2000, ge=100)
@@ -338,9 +354,10 @@ class Settings(BaseSettings):
             "complex_analytics_artifacts": self.get_complex_analytics_artifact_dir(),
         }
 
-    def get_vectordb_path(self) -> Path:
+    def get_vectordb_path(self, *, create: bool = True) -> Path:
         path = self._resolve_runtime_path(self.VECTORDB_PATH)
-        path.mkdir(parents=True, exist_ok=True)
+        if create:
+            path.mkdir(parents=True, exist_ok=True)
         return path
 
     def is_file_supported(self, filename: str) -> bool:
@@ -1,5 +1,7 @@
 # app/core/security.py
+import asyncio
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Optional, Union
 from argon2 import PasswordHasher  # НОВОЕ
 from argon2.exceptions import VerifyMismatchError, InvalidHash  # НОВОЕ
@@ -20,6 +22,9 @@ ph = PasswordHasher(
 ALGORITHM = settings.JWT_ALGORITHM
 SECRET_KEY = settings.JWT_SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+# Built once; decode_access_token runs on every authenticated request
+_DECODE_ALGORITHMS = [ALGORITHM]
+_DECODE_OPTIONS = {"require_sub": True, "require_exp": True}
 
 
 def create_access_token(
@@ -44,7 +49,8 @@ def decode_access_token(token: str) -> Optional[dict]:
     Decode a JWT access token
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # One verified decode; missing/invalid "sub" or "exp" fail here as JWTError
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_DECODE_ALGORITHMS, options=_DECODE_OPTIONS)
         return payload
     except JWTError:
         return None
@@ -68,3 +74,38 @@ def get_password_hash(password: str) -> str:
     ИЗМЕНЕНО: теперь использует Argon2 вместо bcrypt
     """
     return ph.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password in a worker thread: Argon2 is CPU-heavy by design
+    and must not block the event loop
+    """
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash in a worker thread (see verify_password_async)
+    """
+    return await asyncio.to_thread(get_password_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    return ph.hash("dummy-password-for-unknown-users")
+
+
+def burn_password_verification(plain_password: str) -> None:
+    """
+    Do the same Argon2 work as a real verify for a user that does not exist,
+    so login timing does not reveal whether a username is registered
+    """
+    verify_password(plain_password, _dummy_password_hash())
+
+
+async def burn_password_verification_async(plain_password: str) -> None:
+    """
+    burn_password_verification in a worker thread (see verify_password_async)
+    """
+    await asyncio.to_thread(burn_password_verification, plain_password)
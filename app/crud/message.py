@@ -2,10 +2,11 @@
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from sqlalchemy import select, and_
+from sqlalchemy import Row, select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
+from app.db.models.conversation import Conversation
 from app.db.models.message import Message
 
 
@@ -36,16 +37,15 @@ class CRUDMessage(CRUDBase[Message, dict, dict]):
             timestamp=datetime.utcnow()
         )
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
 
-        # Update conversation's updated_at
-        from app.crud.conversation import crud_conversation
-        conversation = await crud_conversation.get(db, id=conversation_id)
+        # Update conversation's updated_at in the same transaction.
+        # session.get() is served from the identity map when the request already
+        # loaded the conversation; all Message defaults are client-side, so no refresh.
+        conversation = await db.get(Conversation, conversation_id)
         if conversation:
             conversation.updated_at = datetime.utcnow()
-            conversation.message_count += 1
-            await db.commit()
+            conversation.message_count = (conversation.message_count or 0) + 1
+        await db.commit()
 
         return db_obj
 
@@ -76,14 +76,17 @@ class CRUDMessage(CRUDBase[Message, dict, dict]):
             *,
             conversation_id: UUID,
             count: int = 10
-    ) -> List[Message]:
-        """Get last N messages from conversation"""
-        query = select(Message).where(
+    ) -> List[Row]:
+        """
+        Get last N messages from conversation as (role, content) rows.
+        Only feeds the LLM history, so ORM objects are not hydrated.
+        """
+        query = select(Message.role, Message.content).where(
             Message.conversation_id == conversation_id
         ).order_by(Message.timestamp.desc()).limit(count)
 
         result = await db.execute(query)
-        messages = result.scalars().all()
+        messages = result.all()
         # Return in chronological order
         return list(reversed(messages))
 
@@ -1,12 +1,12 @@
 # app/crud/user.py
-from typing import Optional
-from sqlalchemy import select
+from typing import List, Optional
+from sqlalchemy import lambda_stmt, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
 from app.db.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import burn_password_verification_async, get_password_hash_async, verify_password_async
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -19,17 +19,26 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
     async def get_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
         """Get user by username"""
+        # Auth hot path (login, user-cache misses): lambda_stmt caches the built
+        # statement per call site; username is extracted as a bound parameter
         result = await db.execute(
-            select(User).where(User.username == username)
+            lambda_stmt(lambda: select(User).where(User.username == username))
         )
         return result.scalar_one_or_none()
 
+    async def get_by_username_or_email(self, db: AsyncSession, *, username: str, email: str) -> List[User]:
+        """Users matching the username or the email, in one query (at most two rows)"""
+        result = await db.execute(
+            select(User).where(or_(User.username == username, User.email == email)).limit(2)
+        )
+        return list(result.scalars().all())
+
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         """Create new user with hashed password"""
         db_obj = User(
             username=obj_in.username,
             email=obj_in.email,
-            password_hash=get_password_hash(obj_in.password),
+            password_hash=await get_password_hash_async(obj_in.password),
             fullname=obj_in.fullname
         )
         db.add(db_obj)
@@ -43,8 +52,9 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Authenticate user"""
         user = await self.get_by_username(db, username=username)
         if not user:
+            await burn_password_verification_async(password)
             return None
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             return None
         return user
 
@@ -6,7 +6,11 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import List, Optional
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
+from typing import List, Optional, Tuple
 
 from app.core.config import settings
 from app.services.llm.manager import llm_manager
@@ -42,6 +46,10 @@ class EmbeddingsManager:
         self.keycloak_token = keycloak_token or settings.CORPORATE_API_TOKEN
         self.system_user = system_user or settings.CORPORATE_API_USERNAME
 
+        # Recent query embeddings: (mode, model, text digest) -> (expires_at, vector).
+        # Only touched from the event loop between awaits, so no lock is needed.
+        self._query_cache: "OrderedDict[Tuple[str, Optional[str], bytes], Tuple[float, List[float]]]" = OrderedDict()
+
         logger.info("EmbeddingsManager initialized: requested_mode=%s mode=%s model=%s", mode, self.mode, model)
 
     def _provider_source(self) -> str:
@@ -94,6 +102,37 @@ class EmbeddingsManager:
             raise RuntimeError("Install nest_asyncio or use embedd_documents_async") from exc
         return asyncio.run(self.embedd_documents_async(texts))
 
+    async def embed_query_async(self, text: str) -> List[float]:
+        """
+        Embed a single retrieval query, reusing the vector for identical recent queries.
+
+        Follow-up turns and rewritten prompts often repeat the same query text; a hit
+        skips the provider round-trip entirely. Returns [] when the provider yields nothing.
+        """
+        max_size = int(getattr(settings, "EMBEDDINGS_QUERY_CACHE_SIZE", 0) or 0)
+        ttl = float(getattr(settings, "EMBEDDINGS_QUERY_CACHE_TTL_SECONDS", 0.0) or 0.0)
+        if max_size <= 0 or ttl <= 0:
+            vectors = await self.embedd_documents_async([text])
+            return vectors[0] if vectors else []
+
+        key = (self.mode, self.model, blake2b(text.encode("utf-8"), digest_size=16).digest())
+        now = time.monotonic()
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                self._query_cache.move_to_end(key)
+                return list(cached[1])
+            self._query_cache.pop(key, None)
+
+        vectors = await self.embedd_documents_async([text])
+        if not vectors:
+            return []
+        self._query_cache[key] = (time.monotonic() + ttl, list(vectors[0]))
+        self._query_cache.move_to_end(key)
+        while len(self._query_cache) > max_size:
+            self._query_cache.popitem(last=False)
+        return vectors[0]
+
     async def embedd_documents_async(self, texts: List[str]) -> List[List[float]]:
         if not texts:
             return []
@@ -180,8 +219,8 @@ class EmbeddingsManager:
             if len(segments) > 1:
                 segmented_inputs += 1
                 segment_calls_total += len(segments)
-                segment_vectors: List[List[float]] = []
-                for seg in segments:
+
+                async def _embed_segment(seg: str) -> List[float]:
                     async with semaphore:
                         segment_embedding = await llm_manager.generate_embedding(
                             text=seg,
@@ -190,7 +229,10 @@ class EmbeddingsManager:
                         )
                     if not segment_embedding:
                         raise RuntimeError(f"Empty embedding returned for text index={idx} segment")
-                    segment_vectors.append(segment_embedding)
+                    return segment_embedding
+
+                # Segments share the batch semaphore, so a long text no longer serializes its requests.
+                segment_vectors = list(await asyncio.gather(*[_embed_segment(seg) for seg in segments]))
                 embedding = _mean_pool(segment_vectors)
             else:
                 async with semaphore:
@@ -289,3 +331,16 @@ class EmbeddingsManager:
 
 
 embeddings_manager = EmbeddingsManager()
+
+
+@lru_cache(maxsize=16)
+def _cached_embeddings_manager(mode: str, model: Optional[str]) -> EmbeddingsManager:
+    return EmbeddingsManager(mode=mode, model=model)
+
+
+def get_embeddings_manager(mode: str = "local", model: Optional[str] = None) -> EmbeddingsManager:
+    """
+    Shared EmbeddingsManager per (mode, model). Treat it as read-only:
+    callers that need switch_mode/switch_model should build their own instance.
+    """
+    return _cached_embeddings_manager(str(mode or "local").strip().lower(), model)
@@ -0,0 +1,178 @@
+"""
+Matryoshka prefix index for VectorStoreManager.
+
+Embeddings from MRL-trained models keep most of their signal in the leading
+dimensions. With VECTORDB_MRL_INDEX_DIM set, each full collection gets a sidecar
+"<collection>_mrl<dim>" holding the same rows truncated to that prefix: kNN runs
+on the smaller vectors with oversampling, and candidates are reranked by the
+full vectors read back from the main collection.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.rag.vector_store import VectorStoreManager
+
+logger = logging.getLogger(__name__)
+
+_PREFIX_INDEX_RE = re.compile(r"_mrl\d+$")
+
+
+def is_prefix_collection(name: str) -> bool:
+    return bool(_PREFIX_INDEX_RE.search(name))
+
+
+def rerank_by_full_embedding(
+    embedding_query: Sequence[float],
+    candidates: List[Dict[str, Any]],
+    full_vectors: Dict[str, Any],
+    top_k: int,
+) -> List[Dict[str, Any]]:
+    """Re-score prefix-index candidates by squared L2 (Chroma's default space) on full vectors."""
+    rows = [row for row in candidates if full_vectors.get(row["id"]) is not None]
+    if not rows:
+        return []
+    matrix = np.asarray([full_vectors[row["id"]] for row in rows], dtype=np.float32)
+    diff = matrix - np.asarray(embedding_query, dtype=np.float32)
+    distances = np.einsum("ij,ij->i", diff, diff)
+    order = np.argsort(distances, kind="stable")[:top_k]
+    return [{**rows[i], "distance": float(distances[i])} for i in order]
+
+
+class PrefixIndex:
+    """
+    Sidecar collections of one VectorStoreManager; index_dim=0 disables them.
+    Collection handles, writes and counts go through the owning manager.
+    """
+
+    def __init__(self, store: "VectorStoreManager", *, index_dim: int, oversample: int):
+        self.store = store
+        self.index_dim = int(index_dim)
+        self.oversample = max(1, int(oversample))
+        self._collections: Dict[Tuple[int, Optional[str], Optional[str]], Any] = {}
+        self._lock = Lock()
+
+    def covers(self, dimension: int) -> bool:
+        return 0 < self.index_dim < dimension
+
+    def _ensure_collection(
+        self,
+        dimension: int,
+        *,
+        embedding_mode: Optional[str],
+        embedding_model: Optional[str],
+    ) -> Tuple[str, Any]:
+        """(full collection name, sidecar collection)."""
+        store = self.store
+        cache_key = store._collection_cache_key(
+            dimension=dimension,
+            embedding_mode=embedding_mode,
+            embedding_model=embedding_model,
+        )
+        full_name = store._get_collection_name(
+            dimension,
+            embedding_mode=embedding_mode,
+            embedding_model=embedding_model,
+        )
+        collection = self._collections.get(cache_key)
+        if collection is not None:
+            return full_name, collection
+        name = f"{full_name}_mrl{self.index_dim}"
+        with self._lock:
+            collection = self._collections.get(cache_key) or store._known_collection(name)
+            if collection is not None:
+                self._collections[cache_key] = collection
+                return full_name, collection
+            collection = store._open_collection(
+                name,
+                metadata={
+                    "dimension": self.index_dim,
+                    "full_dimension": dimension,
+                    "embedding_mode": embedding_mode or "",
+                    "embedding_model": embedding_model or "",
+                },
+            )
+            self._collections[cache_key] = collection
+        store._register_collection(name, collection)
+        logger.info("Prefix index collection initialized: %s index_dim=%d", name, self.index_dim)
+        return full_name, collection
+
+    def write(
+        self,
+        dimension: int,
+        *,
+        embedding_mode: Optional[str],
+        embedding_model: Optional[str],
+        batch: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Best-effort sidecar write: the rows are already in the full collection,
+        and queries fall back to it while the prefix index lags behind.
+        """
+        try:
+            full_name, collection = self._ensure_collection(
+                dimension,
+                embedding_mode=embedding_mode,
+                embedding_model=embedding_model,
+            )
+            # the rerank joins prefix hits to full vectors by id
+            if not all(item.get("doc_id") for item in batch):
+                return
+            prefix_batch = [{**item, "embedding": item["embedding"][:self.index_dim]} for item in batch]
+            # rows keep the full collection name: they are the same documents
+            self.store._write_batch(collection, collection_name=full_name, dimension=dimension, batch=prefix_batch)
+            self.store._invalidate_count(getattr(collection, "name", None))
+        except Exception:
+            logger.warning(
+                "Prefix index write failed: dim=%d size=%d mode=%s model=%s",
+                dimension,
+                len(batch),
+                embedding_mode or "-",
+                embedding_model or "-",
+                exc_info=True,
+            )
+
+    def query(
+        self,
+        embedding_query: List[float],
+        *,
+        embedding_mode: Optional[str],
+        embedding_model: Optional[str],
+        top_k: int,
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Prefix search + full-vector rerank; None means "use the full collection"."""
+        store = self.store
+        dimension = len(embedding_query)
+        full = store._ensure_collection_by_dim(dimension, embedding_mode=embedding_mode, embedding_model=embedding_model)
+        _, prefix = self._ensure_collection(
+            dimension,
+            embedding_mode=embedding_mode,
+            embedding_model=embedding_model,
+        )
+        # Rows indexed before the prefix index was enabled would be invisible to it.
+        if store._cached_count(prefix) < store._cached_count(full):
+            return None
+
+        candidates = store._query_collection(
+            collection=prefix,
+            embedding_query=embedding_query[:self.index_dim],
+            top_k=top_k * self.oversample,
+            where=where,
+            where_document=where_document,
+        )
+        if not candidates:
+            return None
+        stored = full.get(ids=[row["id"] for row in candidates], include=["embeddings"])
+        # Chroma returns embeddings as an ndarray: no truthiness checks on it.
+        embeddings = stored.get("embeddings")
+        full_vectors = dict(zip(stored.get("ids") or [], [] if embeddings is None else embeddings))
+        return rerank_by_full_embedding(embedding_query, candidates, full_vectors, top_k)
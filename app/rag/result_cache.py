@@ -0,0 +1,79 @@
+"""
+Exact-match cache for vector search results.
+
+A retried or regenerated chat turn embeds the same question to the same vector
+and runs the same filtered kNN. Results are kept for a short TTL in an LRU and
+dropped as soon as the caller's data generation moves (any write or delete).
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def copy_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Callers annotate rows and their metadata in place.
+    return [{**row, "metadata": dict(row.get("metadata") or {})} for row in rows]
+
+
+class QueryResultCache:
+    """
+    Rows keyed by (vector digest, top_k, filters); at most max_entries are kept
+    and each lives ttl_seconds. Thread-safe: queries run in worker threads.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def key(
+        self,
+        embedding_query: Sequence[float],
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        search_all_dimensions: bool,
+        where_document: Optional[Dict[str, Any]],
+    ) -> Optional[Tuple[Any, ...]]:
+        """(dimension, vector digest, top_k, search_all_dimensions, predicates); None when not cacheable."""
+        if not self.enabled:
+            return None
+        try:
+            predicates = json.dumps([filter_dict, where_document], sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return None
+        vector_digest = sha1(np.asarray(embedding_query, dtype=np.float32).tobytes()).hexdigest()
+        return (len(embedding_query), vector_digest, int(top_k), bool(search_all_dimensions), predicates)
+
+    def get(self, key: Tuple[Any, ...], *, generation: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_generation, stored_at, rows = entry
+            if stored_generation != generation or time.monotonic() - stored_at >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy_rows(rows)
+
+    def put(self, key: Tuple[Any, ...], rows: List[Dict[str, Any]], *, generation: int) -> None:
+        """Store rows; generation is the one observed before the rows were computed."""
+        entry = (generation, time.monotonic(), copy_rows(rows))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -5,14 +5,13 @@ import logging
 import re
 import time
 from dataclasses import dataclass
-from threading import Lock
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from langchain_core.documents import Document
 
 from app.core.config import settings
 from app.observability.metrics import inc_counter, observe_ms
-from app.rag.embeddings import EmbeddingsManager
+from app.rag.embeddings import get_embeddings_manager
 from app.rag.retriever_helpers import (
     build_context_prompt as build_context_prompt_helper,
     build_where as build_where_helper,
@@ -25,7 +24,7 @@ from app.rag.retriever_helpers import (
     select_with_coverage as select_with_coverage_helper,
     tokenize as tokenize_helper,
 )
-from app.rag.vector_store import VectorStoreManager
+from app.rag.vector_store import VectorStoreManager, get_vectorstore_manager, run_search
 
 logger = logging.getLogger(__name__)
 
@@ -51,18 +50,14 @@ class RetrievalDebug:
 class RAGRetriever:
     def __init__(self) -> None:
         self._vectorstore: Optional[VectorStoreManager] = None
-        self._vectorstore_lock = Lock()
         logger.info("RAGRetriever configured: vectorstore_lazy_initialized=%s", False)
 
     @property
     def vectorstore(self) -> VectorStoreManager:
-        if self._vectorstore is not None:
-            return self._vectorstore
-        with self._vectorstore_lock:
-            if self._vectorstore is None:
-                self._vectorstore = VectorStoreManager()
-                logger.info("RAGRetriever vectorstore initialized lazily")
-            return self._vectorstore
+        if self._vectorstore is None:
+            self._vectorstore = get_vectorstore_manager()
+            logger.info("RAGRetriever vectorstore initialized lazily")
+        return self._vectorstore
 
     def _tokenize(self, text: str) -> List[str]:
         return tokenize_helper(text, TOKEN_RE)
@@ -322,17 +317,16 @@ class RAGRetriever:
             )
             return (docs, debug) if return_debug else docs
 
-        embedder = EmbeddingsManager(mode=embedding_mode, model=embedding_model)
+        embedder = get_embeddings_manager(mode=embedding_mode, model=embedding_model)
         t_embed = time.perf_counter()
-        q_vecs = await embedder.embedd_documents_async([query])
+        q_vec = await embedder.embed_query_async(query)
         observe_ms("rag_embed_duration_ms", (time.perf_counter() - t_embed) * 1000.0, mode=embedding_mode)
-        if not q_vecs:
+        if not q_vec:
             docs = []
             debug = RetrievalDebug(where=where, top_k=top_k, fetch_k=fetch_k or 0, raw_count=0, returned_count=0)
             inc_counter("rag_retrieve_total", intent=intent, mode="hybrid", result="empty_embedding")
             observe_ms("rag_retrieve_duration_ms", (time.perf_counter() - t0) * 1000.0, intent=intent)
             return (docs, debug) if return_debug else docs
-        q_vec = q_vecs[0]
 
         if fetch_k is None:
             fetch_k = max(top_k * int(settings.RAG_FETCH_K_MULTIPLIER), int(settings.RAG_FETCH_K_MIN))
@@ -346,13 +340,13 @@ class RAGRetriever:
         logger.info("RAG.retrieve(hybrid): intent=%s top_k=%d fetch_k=%d where=%s", intent, top_k, fetch_k, where)
 
         t_denselex = time.perf_counter()
-        dense_rows_task = asyncio.to_thread(
+        dense_rows_task = run_search(
             self.vectorstore.query,
             embedding_query=q_vec,
             top_k=fetch_k,
             filter_dict=where,
         )
-        lexical_pool_task = asyncio.to_thread(
+        lexical_pool_task = run_search(
             self.vectorstore.get_by_filter,
             filter_dict=where,
             limit_per_collection=lexical_pool_limit,
@@ -468,7 +462,7 @@ class RAGRetriever:
             embedding_mode=embedding_mode,
             embedding_model=embedding_model,
         )
-        rows = await asyncio.to_thread(
+        rows = await run_search(
             self.vectorstore.get_by_filter,
             filter_dict=where,
             limit_per_collection=max_chunks,
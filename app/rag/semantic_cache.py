@@ -0,0 +1,141 @@
+"""
+Similarity-keyed cache for vector search results.
+
+Retries and light rephrasings of a question embed to nearly the same vector,
+and their nearest neighbours are then almost always the same rows. The cache
+answers such a query from the closest cached vector when cosine similarity
+reaches a threshold, skipping the ANN search.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+class _Bucket:
+    __slots__ = ("vectors", "payloads", "stored_at")
+
+    def __init__(self, dim: int):
+        # Rows are unit-normalized float32 vectors in insertion order, so both
+        # TTL expiry and size eviction drop a prefix.
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.payloads: List[Any] = []
+        self.stored_at: List[float] = []
+
+    def drop_prefix(self, count: int) -> int:
+        count = min(max(0, count), len(self.payloads))
+        if count:
+            self.vectors = self.vectors[count:]
+            del self.payloads[:count]
+            del self.stored_at[:count]
+        return count
+
+
+class SemanticCache:
+    """
+    Payloads keyed by (scope, query vector). The scope holds everything other
+    than the vector that shapes a result (top_k, filters, ...); only entries of
+    the same scope and dimension are compared. At most max_entries are kept in
+    total (oldest entries of the least recently used scope go first); entries
+    expire after ttl_seconds and all are dropped when the caller's data
+    generation changes.
+    Thread-safe: vector search runs in worker threads.
+    """
+
+    def __init__(self, *, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = float(threshold)
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._size = 0
+        self._generation: Optional[int] = None
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return 0.0 < self.threshold <= 1.0 and self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+        arr = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(arr))
+        if arr.size == 0 or not np.isfinite(norm) or norm == 0.0:
+            return None
+        return arr / norm
+
+    def _sync_generation(self, generation: int) -> bool:
+        """False when the caller's generation is older than the cached data."""
+        if self._generation == generation:
+            return True
+        if self._generation is not None and generation < self._generation:
+            return False
+        self._buckets.clear()
+        self._size = 0
+        self._generation = generation
+        return True
+
+    def _expire(self, bucket: _Bucket, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        expired = 0
+        for stored_at in bucket.stored_at:
+            if stored_at > cutoff:
+                break
+            expired += 1
+        self._size -= bucket.drop_prefix(expired)
+
+    def lookup(self, scope: Hashable, vector: Sequence[float], *, generation: int) -> Optional[Any]:
+        """Payload of the most similar cached vector in scope, if similarity >= threshold."""
+        if not self.enabled:
+            return None
+        query = self._normalize(vector)
+        if query is None:
+            return None
+        with self._lock:
+            if not self._sync_generation(generation):
+                return None
+            bucket = self._buckets.get(scope)
+            if bucket is None or bucket.vectors.shape[1] != query.shape[0]:
+                return None
+            self._expire(bucket, time.monotonic())
+            if not bucket.payloads:
+                return None
+            scores = bucket.vectors @ query
+            best = int(np.argmax(scores))
+            if float(scores[best]) < self.threshold:
+                return None
+            self._buckets.move_to_end(scope)
+            return bucket.payloads[best]
+
+    def store(self, scope: Hashable, vector: Sequence[float], payload: Any, *, generation: int) -> None:
+        """Add a payload; generation is the one observed before the payload was computed."""
+        if not self.enabled:
+            return
+        row = self._normalize(vector)
+        if row is None:
+            return
+        with self._lock:
+            if not self._sync_generation(generation):
+                return
+            bucket = self._buckets.get(scope)
+            if bucket is None or bucket.vectors.shape[1] != row.shape[0]:
+                if bucket is not None:
+                    self._size -= len(bucket.payloads)
+                bucket = _Bucket(row.shape[0])
+                self._buckets[scope] = bucket
+            self._buckets.move_to_end(scope)
+            now = time.monotonic()
+            self._expire(bucket, now)
+            bucket.vectors = np.vstack([bucket.vectors, row[None, :]])
+            bucket.payloads.append(payload)
+            bucket.stored_at.append(now)
+            self._size += 1
+            while self._size > self.max_entries:
+                oldest_scope, oldest = next(iter(self._buckets.items()))
+                self._size -= oldest.drop_prefix(self._size - self.max_entries)
+                if not oldest.payloads:
+                    del self._buckets[oldest_scope]
@@ -1,6 +1,9 @@
 # app/rag/text_splitter.py
+import asyncio
 import logging
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import numpy as np
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from app.core.config import settings
@@ -10,6 +13,17 @@ logger = logging.getLogger(__name__)
 MIN_CHUNK_SIZE = 50
 DEFAULT_CHUNK_SIZE = getattr(settings, "CHUNK_SIZE", 800) or 800
 DEFAULT_CHUNK_OVERLAP = getattr(settings, "CHUNK_OVERLAP", 200) or 200
+TABLE_FILE_TYPES = ('csv', 'xlsx', 'xls')
+_FILE_TYPE_TO_SPLITTER = {
+    **{file_type: 'table' for file_type in TABLE_FILE_TYPES},
+    'json': 'json',
+    'md': 'md',
+}
+_SPLITTER_SEPARATORS = {
+    'table': ["\n" + "=" * 70, "\n" + "-" * 70, "\n\n", "\n"],
+    'json': ["\n\n", "\n", ",", " "],
+    'md': ["\n## ", "\n### ", "\n\n", "\n", ". ", " "],
+}
 
 
 class SmartTextSplitter:
@@ -25,24 +39,26 @@ class SmartTextSplitter:
         try:
             raw_chunk_size = int(raw_chunk_size)
         except Exception:
-            logger.warning(f"chunk_size={raw_chunk_size} is not int, fallback to {DEFAULT_CHUNK_SIZE}")
+            logger.warning("chunk_size=%s is not int, fallback to %s", raw_chunk_size, DEFAULT_CHUNK_SIZE)
             raw_chunk_size = DEFAULT_CHUNK_SIZE
 
         if raw_chunk_size < MIN_CHUNK_SIZE:
-            logger.warning(f"chunk_size={raw_chunk_size} < {MIN_CHUNK_SIZE}, bumping to {MIN_CHUNK_SIZE}")
+            logger.warning("chunk_size=%s < %s, bumping to %s", raw_chunk_size, MIN_CHUNK_SIZE, MIN_CHUNK_SIZE)
             raw_chunk_size = MIN_CHUNK_SIZE
 
         try:
             raw_chunk_overlap = int(raw_chunk_overlap)
         except Exception:
-            logger.warning(f"chunk_overlap={raw_chunk_overlap} is not int, fallback to {DEFAULT_CHUNK_OVERLAP}")
+            logger.warning("chunk_overlap=%s is not int, fallback to %s", raw_chunk_overlap, DEFAULT_CHUNK_OVERLAP)
             raw_chunk_overlap = DEFAULT_CHUNK_OVERLAP
 
         if raw_chunk_overlap >= raw_chunk_size:
             adjusted = max(0, raw_chunk_size // 4)
             logger.warning(
-                f"chunk_overlap={raw_chunk_overlap} >= chunk_size={raw_chunk_size}, "
-                f"reducing overlap to {adjusted}"
+                "chunk_overlap=%s >= chunk_size=%s, reducing overlap to %s",
+                raw_chunk_overlap,
+                raw_chunk_size,
+                adjusted,
             )
             raw_chunk_overlap = adjusted
 
@@ -57,26 +73,82 @@ class SmartTextSplitter:
             length_function=len,
             is_separator_regex=False
         )
+        self._splitters: Dict[str, RecursiveCharacterTextSplitter] = {}
 
         logger.info(
-            f"✅ SmartTextSplitter initialized: chunk_size={self.chunk_size}, overlap={self.chunk_overlap}"
+            "✅ SmartTextSplitter initialized: chunk_size=%d, overlap=%d", self.chunk_size, self.chunk_overlap
         )
 
+    def _splitter_for(self, file_type: str) -> RecursiveCharacterTextSplitter:
+        """
+        Splitter for the given file type, built lazily once per instance.
+        Table data is cut on the loader's row-block separators.
+        """
+        key = _FILE_TYPE_TO_SPLITTER.get((file_type or '').lower())
+        if key is None:
+            return self.text_splitter
+
+        splitter = self._splitters.get(key)
+        if splitter is None:
+            if key == 'table':
+                logger.info("📊 Using table-aware splitting for %s", file_type)
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=min(self.chunk_overlap, 100) if key == 'table' else self.chunk_overlap,
+                separators=_SPLITTER_SEPARATORS[key],
+                length_function=len
+            )
+            self._splitters[key] = splitter
+        return splitter
+
     def split_text(self, text: str) -> List[str]:
         try:
-            if not text or not text.strip():
+            if not text or text.isspace():
                 logger.warning("⚠️ Empty text provided for splitting")
                 return []
 
-            logger.info(f"🔪 Splitting text ({len(text)} chars)...")
+            logger.info("🔪 Splitting text (%d chars)...", len(text))
             chunks = self.text_splitter.split_text(text)
-            logger.info(f"✅ Text split into {len(chunks)} chunks")
+            logger.info("✅ Text split into %d chunks", len(chunks))
             return chunks
 
         except Exception as e:
-            logger.error(f"❌ Error splitting text: {e}")
+            logger.error("❌ Error splitting text: %s", e)
             raise
 
+    def _split_document_text(self, file_type: str, text: str) -> List[str]:
+        if file_type in TABLE_FILE_TYPES:
+            # FIX: мягкая нарезка по логическим разделителям, без раздувания chunk_size
+            return self._splitter_for(file_type).split_text(text)
+        return self.text_splitter.split_text(text)
+
+    @staticmethod
+    def _stamp_chunks(doc_idx: int, doc: Document, text_chunks: List[str]) -> Iterator[Document]:
+        total_chunks = len(text_chunks)
+        for chunk_idx, chunk_text in enumerate(text_chunks):
+            metadata = {
+                **doc.metadata,
+                'chunk_index': chunk_idx,
+                'total_chunks': total_chunks,
+                'doc_index': doc_idx,
+                'chunk_size': len(chunk_text)
+            }
+            yield Document(page_content=chunk_text, metadata=metadata)
+
+    def iter_split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Yield chunk Documents one source document at a time.
+        Memory is bounded per source document: the chunks of the current
+        document are split eagerly, documents after it are not touched yet.
+        """
+        for doc_idx, doc in enumerate(documents):
+            file_type = (doc.metadata.get('file_type') or '').lower()
+            yield from self._stamp_chunks(doc_idx, doc, self._split_document_text(file_type, doc.page_content))
+
+    async def asplit_documents(self, documents: List[Document]) -> List[Document]:
+        """split_documents in a worker thread, so large inputs do not block the event loop."""
+        return await asyncio.to_thread(self.split_documents, documents)
+
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """
         Разбить список Document объектов с учетом типа файла.
@@ -88,41 +160,14 @@ class SmartTextSplitter:
                 logger.warning("⚠️ Empty documents list provided")
                 return []
 
-            logger.info(f"🔪 Splitting {len(documents)} documents...")
-            all_chunks = []
-
-            for doc_idx, doc in enumerate(documents):
-                file_type = (doc.metadata.get('file_type') or '').lower()
-
-                if file_type in ['xlsx', 'xls', 'csv']:
-                    # FIX: мягкая нарезка по логическим разделителям, без раздувания chunk_size
-                    logger.info(f"📊 Using table-aware splitting for {file_type}")
-                    table_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=self.chunk_size,
-                        chunk_overlap=min(self.chunk_overlap, 100),
-                        separators=["\n" + "=" * 70, "\n" + "-" * 70, "\n\n", "\n"],
-                        length_function=len
-                    )
-                    text_chunks = table_splitter.split_text(doc.page_content)
-                else:
-                    text_chunks = self.text_splitter.split_text(doc.page_content)
-
-                for chunk_idx, chunk_text in enumerate(text_chunks):
-                    metadata = doc.metadata.copy()
-                    metadata.update({
-                        'chunk_index': chunk_idx,
-                        'total_chunks': len(text_chunks),
-                        'doc_index': doc_idx,
-                        'chunk_size': len(chunk_text)
-                    })
-
-                    all_chunks.append(Document(page_content=chunk_text, metadata=metadata))
-
-            logger.info(f"✅ Created {len(all_chunks)} document chunks")
+            logger.info("🔪 Splitting %d documents...", len(documents))
+            all_chunks = list(self.iter_split_documents(documents))
+
+            logger.info("✅ Created %d document chunks", len(all_chunks))
             return all_chunks
 
         except Exception as e:
-            logger.error(f"❌ Error splitting documents: {e}")
+            logger.error("❌ Error splitting documents: %s", e)
             raise
 
     def split_by_file_type(self, text: str, file_type: str, metadata: Dict[str, Any] = None) -> List[Document]:
@@ -134,51 +179,27 @@ class SmartTextSplitter:
             metadata = metadata or {}
             metadata['file_type'] = file_type
 
-            if file_type in ['csv', 'xlsx', 'xls']:
-                splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=self.chunk_size,
-                    chunk_overlap=min(self.chunk_overlap, 100),
-                    separators=["\n" + "=" * 70, "\n" + "-" * 70, "\n\n", "\n"],
-                    length_function=len
-                )
-                chunks = splitter.split_text(text)
-
-            elif file_type == 'json':
-                splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=self.chunk_size,
-                    chunk_overlap=self.chunk_overlap,
-                    separators=["\n\n", "\n", ",", " "],
-                    length_function=len
-                )
-                chunks = splitter.split_text(text)
-
-            elif file_type == 'md':
-                splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=self.chunk_size,
-                    chunk_overlap=self.chunk_overlap,
-                    separators=["\n## ", "\n### ", "\n\n", "\n", ". ", " "],
-                    length_function=len
+            chunks = self._splitter_for(file_type).split_text(text)
+
+            total_chunks = len(chunks)
+            documents = [
+                Document(
+                    page_content=chunk,
+                    metadata={
+                        **metadata,
+                        'chunk_index': idx,
+                        'total_chunks': total_chunks,
+                        'chunk_size': len(chunk)
+                    }
                 )
-                chunks = splitter.split_text(text)
-
-            else:
-                chunks = self.split_text(text)
-
-            documents = []
-            for idx, chunk in enumerate(chunks):
-                doc_metadata = metadata.copy()
-                doc_metadata.update({
-                    'chunk_index': idx,
-                    'total_chunks': len(chunks),
-                    'chunk_size': len(chunk)
-                })
-                documents.append(Document(page_content=chunk, metadata=doc_metadata))
-
-            logger.info(f"✅ Split {file_type} into {len(documents)} chunks")
+                for idx, chunk in enumerate(chunks)
+            ]
+
+            logger.info("✅ Split %s into %d chunks", file_type, len(documents))
             return documents
 
         except Exception as e:
-            logger.error(f"❌ Error splitting by file type: {e}")
+            logger.error("❌ Error splitting by file type: %s", e)
             raise
 
     def get_chunk_stats(self, documents: List[Document]) -> Dict[str, Any]:
@@ -191,14 +212,42 @@ class SmartTextSplitter:
                 'total_size': 0
             }
 
-        chunk_sizes = [len(doc.page_content) for doc in documents]
+        chunk_sizes = np.fromiter(
+            (len(doc.page_content) for doc in documents), dtype=np.int64, count=len(documents)
+        )
+        total_size = int(chunk_sizes.sum())
         stats = {
-            'total_chunks': len(documents),
-            'avg_chunk_size': sum(chunk_sizes) // len(chunk_sizes),
-            'min_chunk_size': min(chunk_sizes),
-            'max_chunk_size': max(chunk_sizes),
-            'total_size': sum(chunk_sizes),
+            'total_chunks': int(chunk_sizes.size),
+            'avg_chunk_size': total_size // int(chunk_sizes.size),
+            'min_chunk_size': int(chunk_sizes.min()),
+            'max_chunk_size': int(chunk_sizes.max()),
+            'total_size': total_size,
             'overlap_ratio': (self.chunk_overlap / self.chunk_size) if self.chunk_size else 0
         }
-        logger.info(f"📊 Chunk statistics: {stats}")
+        logger.info("📊 Chunk statistics: %s", stats)
         return stats
+
+
+@lru_cache(maxsize=16)
+def _cached_splitter(
+        chunk_size: Optional[int],
+        chunk_overlap: Optional[int],
+        separators: Optional[Tuple[str, ...]],
+) -> SmartTextSplitter:
+    return SmartTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=list(separators) if separators else None,
+    )
+
+
+def get_splitter(
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        separators: List[str] = None
+) -> SmartTextSplitter:
+    """
+    Shared SmartTextSplitter per (chunk_size, chunk_overlap, separators) config.
+    Validation and RecursiveCharacterTextSplitter setup run once per key.
+    """
+    return _cached_splitter(chunk_size, chunk_overlap, tuple(separators) if separators else None)
@@ -1,23 +1,167 @@
 # app/rag/vector_store.py
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import functools
+import heapq
 import json
 import re
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha1
 from threading import Lock
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from app.core.config import settings
+from app.rag.prefix_index import PrefixIndex, is_prefix_collection
+from app.rag.result_cache import QueryResultCache, copy_rows
+from app.rag.semantic_cache import SemanticCache
 
-try:
-    from chromadb import EphemeralClient, PersistentClient
-except ImportError:
-    EphemeralClient = None
-    PersistentClient = None
+# chromadb is imported on first client build (see _load_chromadb_clients):
+# it pulls sqlite/onnx bindings that workers without RAG traffic never need.
+EphemeralClient = None
+PersistentClient = None
 
 logger = logging.getLogger(__name__)
 
+_OPERATOR_KEYS = frozenset({
+    "$and", "$or",
+    "$in", "$nin",
+    "$gt", "$gte", "$lt", "$lte",
+    "$ne", "$eq",
+    "$contains",
+})
+_SCALAR_TYPES = (str, int, float, bool)
+_DIM_RE = re.compile(r"_(\d+)d(?:_|$)")
+# Upper bound on rows per Chroma write call (keeps request payloads bounded).
+_ADD_BATCH_SIZE = 500
+# Only what _parse_results reads; embeddings are never needed by callers.
+_QUERY_INCLUDE = ["documents", "metadatas", "distances"]
+
+
+def _distance_key(row: Dict[str, Any]) -> float:
+    return float(row.get("distance", 1e9))
+
+
+class _FilterFingerprint:
+    """Log-only stand-in for a filter: short stable digest plus top-level keys, rendered lazily."""
+
+    __slots__ = ("_filter",)
+
+    def __init__(self, filter_dict: Optional[Dict[str, Any]]):
+        self._filter = filter_dict
+
+    def __str__(self) -> str:
+        if not self._filter:
+            return "-"
+        payload = json.dumps(self._filter, sort_keys=True, default=str, ensure_ascii=False)
+        digest = sha1(payload.encode("utf-8")).hexdigest()[:8]
+        return f"{digest}[{','.join(sorted(map(str, self._filter)))}]"
+
+
+def _load_chromadb_clients() -> None:
+    global EphemeralClient, PersistentClient
+    try:
+        from chromadb import EphemeralClient as _EphemeralClient, PersistentClient as _PersistentClient
+    except ImportError:
+        return
+    if EphemeralClient is None:
+        EphemeralClient = _EphemeralClient
+    if PersistentClient is None:
+        PersistentClient = _PersistentClient
+
+
+_query_pool: Optional[ThreadPoolExecutor] = None
+_query_pool_lock = Lock()
+
+
+def _get_query_pool() -> ThreadPoolExecutor:
+    # Shared across managers; Chroma releases the GIL inside HNSW search.
+    global _query_pool
+    if _query_pool is None:
+        with _query_pool_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(
+                    max_workers=min(8, (os.cpu_count() or 1) + 4),
+                    thread_name_prefix="chroma-query",
+                )
+    return _query_pool
+
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    # Request-path reads (kNN, metadata scans) are CPU-bound in Chroma; a small
+    # pool keeps concurrent chats from oversubscribing cores. Separate from
+    # _query_pool, which these calls may fan out into.
+    global _search_pool
+    if _search_pool is None:
+        with _query_pool_lock:
+            if _search_pool is None:
+                workers = int(getattr(settings, "VECTORDB_SEARCH_WORKERS", 0) or 0) or min(4, os.cpu_count() or 1)
+                _search_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chroma-search")
+    return _search_pool
+
+
+async def run_search(func: Any, /, *args: Any, **kwargs: Any) -> Any:
+    """asyncio.to_thread on the bounded search pool (context vars are carried over for logging)."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_search_pool(), call)
+
+
+def _as_embedding_matrix(embeddings: Sequence[Union[Sequence[float], np.ndarray]]) -> np.ndarray:
+    """One contiguous float32 (n, dim) block for Chroma instead of nested lists of boxed floats."""
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _sanitize_value(v: Any, *, mode: str, in_operator: bool) -> Any:
+    if v is None:
+        return None
+    t = type(v)
+    if t is str or t is int or t is float or t is bool:
+        return v
+    if isinstance(v, _SCALAR_TYPES):
+        # scalar subclasses (str enums, IntFlag, ...) keep the previous passthrough
+        return v
+    if isinstance(v, (bytes, bytearray)):
+        try:
+            return v.decode("utf-8", errors="ignore")
+        except Exception:
+            return str(v)
+
+    if isinstance(v, dict):
+        is_operator = not _OPERATOR_KEYS.isdisjoint(v)
+        # For where-mode: keep operator dicts and recurse
+        if mode == "where" and is_operator:
+            return {k: _sanitize_value(val, mode=mode, in_operator=True) for k, val in v.items()}
+
+        # For storage-mode OR non-operator dict: must be scalar -> JSON string
+        try:
+            payload = {k: _sanitize_value(val, mode=mode, in_operator=False) for k, val in v.items()}
+            return json.dumps(payload, ensure_ascii=False)
+        except Exception:
+            return str(v)
+
+    if isinstance(v, (list, tuple, set)):
+        items = [_sanitize_value(x, mode=mode, in_operator=in_operator) for x in v]
+        # In where-mode inside operator ($in): keep list
+        if mode == "where" and in_operator:
+            return items
+        # In storage-mode (or not-operator): must be scalar -> JSON string
+        try:
+            return json.dumps(items, ensure_ascii=False)
+        except Exception:
+            return str(items)
+
+    return str(v)
+
 
 class VectorStoreManager:
     """
@@ -26,20 +170,58 @@ class VectorStoreManager:
 
     _shared_clients: Dict[Tuple[str, str], Any] = {}
     _shared_clients_lock: Lock = Lock()
+    # Bumped whenever any manager opens a collection it did not know yet,
+    # so sibling managers in this process refresh their collection registry.
+    _registry_generation: int = 0
+    _REGISTRY_TTL_SECONDS: float = 30.0
+    # Row counts are informational (logs); keep them briefly per (client, collection).
+    _count_cache: Dict[Tuple[Tuple[str, str], str], Tuple[int, float]] = {}
+    _COUNT_TTL_SECONDS: float = 5.0
+    # Rows per collection.get() page in iter_by_filter; bounds what Chroma materializes at once.
+    _GET_PAGE_SIZE: int = 1024
+    # Bumped on every write/delete in this process; cached query results from an
+    # older generation are treated as misses.
+    _data_generation: int = 0
 
     def __init__(
         self,
         base_collection_name: str = None,
-        persist_directory: str = None
+        persist_directory: str = None,
+        index_dim: Optional[int] = None,
+        rerank_oversample: Optional[int] = None,
     ):
         self.base_collection_name = base_collection_name or settings.COLLECTION_NAME
-        self.persist_directory = persist_directory or str(settings.get_vectordb_path())
+        # No filesystem access until the first client is built (see _build_client).
+        self.persist_directory = persist_directory or str(settings.get_vectordb_path(create=False))
         self.ephemeral_mode = bool(getattr(settings, "VECTORDB_EPHEMERAL_MODE", False))
+        # Matryoshka adaptive retrieval: index embedding[:index_dim], rerank with the full vector.
+        self._prefix_index = PrefixIndex(
+            self,
+            index_dim=int(index_dim if index_dim is not None else getattr(settings, "VECTORDB_MRL_INDEX_DIM", 0) or 0),
+            oversample=int(rerank_oversample or getattr(settings, "VECTORDB_MRL_OVERSAMPLE", 4) or 4),
+        )
+        # Recent query() results keyed by (vector digest, top_k, filters); 0 disables.
+        self._result_cache = QueryResultCache(
+            max_entries=int(getattr(settings, "VECTORDB_QUERY_CACHE_SIZE", 0) or 0),
+            ttl_seconds=float(getattr(settings, "VECTORDB_QUERY_CACHE_TTL_SECONDS", 0.0) or 0.0),
+        )
+        # Near-duplicate query vectors (cosine >= VECTORDB_SEMANTIC_CACHE_THRESHOLD) reuse
+        # a cached result of the same scope; shares the result cache's size and TTL.
+        self._semantic_cache = SemanticCache(
+            threshold=float(getattr(settings, "VECTORDB_SEMANTIC_CACHE_THRESHOLD", 0.0) or 0.0),
+            max_entries=self._result_cache.max_entries,
+            ttl_seconds=self._result_cache.ttl_seconds,
+        )
 
         self._client: Optional[Any] = None
+        self._max_batch_size: Optional[int] = None
         self._collections_cache: Dict[Tuple[int, Optional[str], Optional[str]], Any] = {}
-        self._current_collection_key: Optional[Tuple[int, Optional[str], Optional[str]]] = None
-        self._current_collection: Optional[Any] = None
+        # Guards first-touch creation only; cache hits are plain dict reads.
+        self._collections_lock = Lock()
+        self._collection_names: Dict[Tuple[int, Optional[str], Optional[str]], str] = {}
+        self._all_collections_cache: Dict[str, Any] = {}
+        self._all_collections_loaded_at: float = 0.0
+        self._all_collections_generation: int = -1
 
         logger.info(
             (
@@ -68,6 +250,8 @@ class VectorStoreManager:
         return ("persistent", self.persist_directory)
 
     def _build_client(self) -> Any:
+        if (EphemeralClient if self.ephemeral_mode else PersistentClient) is None:
+            _load_chromadb_clients()
         if self.ephemeral_mode:
             if not EphemeralClient:
                 raise ImportError("chromadb EphemeralClient is not available")
@@ -75,6 +259,7 @@ class VectorStoreManager:
 
         if not PersistentClient:
             raise ImportError("chromadb PersistentClient is not available")
+        os.makedirs(self.persist_directory, exist_ok=True)
         return PersistentClient(path=self.persist_directory)
 
     def _get_or_init_client(self) -> Any:
@@ -166,16 +351,23 @@ class VectorStoreManager:
         embedding_mode: Optional[str] = None,
         embedding_model: Optional[str] = None,
     ) -> str:
+        memo_key = (dimension, embedding_mode, embedding_model)
+        name = self._collection_names.get(memo_key)
+        if name is not None:
+            return name
+
         mode, model = self._normalize_embedding_identity(
             embedding_mode=embedding_mode,
             embedding_model=embedding_model,
         )
         if not mode and not model:
             # Keep legacy naming for old collections without model identity.
-            return f"{self.base_collection_name}_{dimension}d"
-
-        identity_hash = sha1(f"{mode}:{model}".encode("utf-8")).hexdigest()[:10]
-        return f"{self.base_collection_name}_{dimension}d_{mode}_{model}_{identity_hash}"
+            name = f"{self.base_collection_name}_{dimension}d"
+        else:
+            identity_hash = sha1(f"{mode}:{model}".encode("utf-8")).hexdigest()[:10]
+            name = f"{self.base_collection_name}_{dimension}d_{mode}_{model}_{identity_hash}"
+        self._collection_names[memo_key] = name
+        return name
 
     def _ensure_collection(
         self,
@@ -184,57 +376,147 @@ class VectorStoreManager:
         embedding_mode: Optional[str] = None,
         embedding_model: Optional[str] = None,
     ) -> Any:
-        dimension = len(embedding)
+        return self._ensure_collection_by_dim(
+            len(embedding),
+            embedding_mode=embedding_mode,
+            embedding_model=embedding_model,
+        )
+
+    def _ensure_collection_by_dim(
+        self,
+        dimension: int,
+        *,
+        embedding_mode: Optional[str] = None,
+        embedding_model: Optional[str] = None,
+    ) -> Any:
         cache_key = self._collection_cache_key(
             dimension=dimension,
             embedding_mode=embedding_mode,
             embedding_model=embedding_model,
         )
+        collection = self._collections_cache.get(cache_key)
+        if collection is not None:
+            return collection
+
         collection_name = self._get_collection_name(
             dimension,
             embedding_mode=embedding_mode,
             embedding_model=embedding_model,
         )
+        try:
+            with self._collections_lock:
+                collection = self._collections_cache.get(cache_key)
+                if collection is not None:
+                    return collection
+                # Warm start: a collection already seen by the registry listing needs no round-trip.
+                collection = self._known_collection(collection_name)
+                if collection is not None:
+                    self._collections_cache[cache_key] = collection
+                    return collection
+                collection = self._open_collection(
+                    collection_name,
+                    metadata={
+                        "dimension": dimension,
+                        "embedding_mode": embedding_mode or "",
+                        "embedding_model": embedding_model or "",
+                    },
+                )
+                self._collections_cache[cache_key] = collection
+            self._register_collection(collection_name, collection)
+        except Exception as e:
+            logger.error("Failed to initialize collection: %s", e, exc_info=True)
+            raise
 
-        if self._current_collection_key == cache_key and self._current_collection is not None:
-            return self._current_collection
+        try:
+            count = self._cached_count(collection)
+        except Exception:
+            count = -1
 
-        if cache_key in self._collections_cache:
-            self._current_collection_key = cache_key
-            self._current_collection = self._collections_cache[cache_key]
-            logger.info("Active collection: %s key=%s", collection_name, cache_key)
-            return self._current_collection
+        logger.info(
+            "Collection initialized: %s dim=%d mode=%s model=%s count=%s",
+            collection_name,
+            dimension,
+            embedding_mode or "",
+            embedding_model or "",
+            str(count),
+        )
+        return collection
 
+    def _open_collection(self, name: str, *, metadata: Dict[str, Any]) -> Any:
+        """Plain get for the steady state; get_or_create only when the collection is missing."""
         try:
-            collection = self.client.get_or_create_collection(
-                name=collection_name,
-                metadata={
-                    "dimension": dimension,
-                    "embedding_mode": embedding_mode or "",
-                    "embedding_model": embedding_model or "",
-                },
+            return self.client.get_collection(name=name)
+        except Exception:
+            # NotFoundError (ValueError on older clients); get_or_create also covers a concurrent create.
+            configuration = self._hnsw_configuration()
+            if configuration:
+                return self.client.get_or_create_collection(name=name, metadata=metadata, configuration=configuration)
+            return self.client.get_or_create_collection(name=name, metadata=metadata)
+
+    @staticmethod
+    def _hnsw_configuration() -> Optional[Dict[str, Any]]:
+        """HNSW settings for new collections (M / ef_* are fixed at build time except ef_search)."""
+        hnsw = {
+            key: value
+            for key, value in (
+                ("max_neighbors", int(getattr(settings, "VECTORDB_HNSW_M", 0) or 0)),
+                ("ef_construction", int(getattr(settings, "VECTORDB_HNSW_CONSTRUCTION_EF", 0) or 0)),
+                ("ef_search", int(getattr(settings, "VECTORDB_HNSW_SEARCH_EF", 0) or 0)),
             )
-            self._collections_cache[cache_key] = collection
-            self._current_collection_key = cache_key
-            self._current_collection = collection
+            if value > 0
+        }
+        return {"hnsw": hnsw} if hnsw else None
 
+    def set_search_ef(self, ef_search: int) -> int:
+        """
+        Change ef_search (the per-query recall/latency knob) on every collection
+        of this base. Returns the number of collections updated.
+        """
+        if ef_search <= 0:
+            raise ValueError("ef_search must be positive")
+        updated = 0
+        for collection in self._iter_base_collections():
             try:
-                count = collection.count()
+                collection.modify(configuration={"hnsw": {"ef_search": int(ef_search)}})
+                updated += 1
             except Exception:
-                count = -1
-
-            logger.info(
-                "Collection initialized: %s dim=%d mode=%s model=%s count=%s",
-                collection_name,
-                dimension,
-                embedding_mode or "",
-                embedding_model or "",
-                str(count),
-            )
-            return collection
-        except Exception as e:
-            logger.error("Failed to initialize collection: %s", e, exc_info=True)
-            raise
+                logger.warning("Could not update ef_search: collection=%s", getattr(collection, "name", "-"), exc_info=True)
+        VectorStoreManager._data_generation += 1
+        logger.info("HNSW ef_search updated: ef_search=%d collections=%d", ef_search, updated)
+        return updated
+
+    def _cached_count(self, collection: Any) -> int:
+        key = (self._cache_key(), str(getattr(collection, "name", "")))
+        now = time.monotonic()
+        cached = self._count_cache.get(key)
+        if cached is not None and now - cached[1] < self._COUNT_TTL_SECONDS:
+            return cached[0]
+        count = int(collection.count())
+        self._count_cache[key] = (count, now)
+        return count
+
+    def _invalidate_count(self, collection_name: Optional[str]) -> None:
+        """Called after every write/delete: drops the row count and expires cached query results."""
+        VectorStoreManager._data_generation += 1
+        if collection_name:
+            self._count_cache.pop((self._cache_key(), collection_name), None)
+
+    def _register_collection(self, name: str, collection: Any) -> None:
+        with self._shared_clients_lock:
+            fresh = self._all_collections_generation == VectorStoreManager._registry_generation
+            VectorStoreManager._registry_generation += 1
+            if fresh and name.startswith(f"{self.base_collection_name}_"):
+                self._all_collections_cache[name] = collection
+                self._all_collections_generation = VectorStoreManager._registry_generation
+
+    def _known_collection(self, name: str) -> Optional[Any]:
+        """Collection handle from the registry listing, if one was loaded and is still current."""
+        if (
+            self._all_collections_generation != VectorStoreManager._registry_generation
+            or time.monotonic() - self._all_collections_loaded_at >= self._REGISTRY_TTL_SECONDS
+        ):
+            return None
+        return self._all_collections_cache.get(name)
 
     def _sanitize(self, data: Dict[str, Any], *, mode: str) -> Dict[str, Any]:
         """
@@ -245,56 +527,15 @@ class VectorStoreManager:
         if not data:
             return {}
 
-        operator_keys = {
-            "$and", "$or",
-            "$in", "$nin",
-            "$gt", "$gte", "$lt", "$lte",
-            "$ne", "$eq",
-            "$contains",
-        }
-
-        def sanitize_value(v: Any, *, in_operator: bool) -> Any:
-            if v is None:
-                return None
-            if isinstance(v, (str, int, float, bool)):
-                return v
-            if isinstance(v, (bytes, bytearray)):
-                try:
-                    return v.decode("utf-8", errors="ignore")
-                except Exception:
-                    return str(v)
-
-            if isinstance(v, dict):
-                is_operator = any(k in operator_keys for k in v.keys())
-                # For where-mode: keep operator dicts and recurse
-                if mode == "where" and is_operator:
-                    return {k: sanitize_value(val, in_operator=True) for k, val in v.items()}
-
-                # For storage-mode OR non-operator dict: must be scalar -> JSON string
-                try:
-                    payload = {k: sanitize_value(val, in_operator=False) for k, val in v.items()}
-                    return json.dumps(payload, ensure_ascii=False)
-                except Exception:
-                    return str(v)
-
-            if isinstance(v, (list, tuple, set)):
-                items = [sanitize_value(x, in_operator=in_operator) for x in list(v)]
-                # In where-mode inside operator ($in): keep list
-                if mode == "where" and in_operator:
-                    return items
-                # In storage-mode (or not-operator): must be scalar -> JSON string
-                try:
-                    return json.dumps(items, ensure_ascii=False)
-                except Exception:
-                    return str(items)
-
-            return str(v)
+        # Fast path: flat dicts of Chroma scalars need no recursive walk.
+        if all(v is None or type(v) in _SCALAR_TYPES for v in data.values()):
+            return dict(data)
 
         out: Dict[str, Any] = {}
         for k, v in data.items():
             # when k itself is an operator key, children are in_operator context
-            in_operator = (mode == "where" and k in operator_keys)
-            out[k] = sanitize_value(v, in_operator=in_operator)
+            in_operator = (mode == "where" and k in _OPERATOR_KEYS)
+            out[k] = _sanitize_value(v, mode=mode, in_operator=in_operator)
 
         return out
 
@@ -315,6 +556,15 @@ class VectorStoreManager:
 
         return where
 
+    def _prepare_where(
+        self, filter_dict: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Sanitized filter (for identity/logging) and the Chroma-ready where clause."""
+        if not filter_dict:
+            return None, None
+        safe_filter = self._sanitize(filter_dict, mode="where")
+        return safe_filter, (self._normalize_where(safe_filter) if safe_filter else None)
+
     def _identity_from_metadata(self, metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
         raw = metadata or {}
         mode_raw = str(raw.get("embedding_mode") or "").strip().lower() or None
@@ -345,7 +595,7 @@ class VectorStoreManager:
         return self._identity_from_metadata({"embedding_mode": mode, "embedding_model": model})
 
     def _extract_dimension_from_name(self, collection_name: str) -> Optional[int]:
-        m = re.search(r"_(\d+)d(?:_|$)", str(collection_name or ""))
+        m = _DIM_RE.search(str(collection_name or ""))
         if not m:
             return None
         try:
@@ -359,13 +609,37 @@ class VectorStoreManager:
         collection: Any,
         embedding_query: List[float],
         top_k: int,
-        safe_filter: Optional[Dict[str, Any]],
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        query_params = {"query_embeddings": [embedding_query], "n_results": top_k}
-        if safe_filter:
-            query_params["where"] = self._normalize_where(safe_filter)
+        return self._query_collection_batch(
+            collection=collection,
+            embedding_queries=[embedding_query],
+            top_k=top_k,
+            where=where,
+            where_document=where_document,
+        )[0]
+
+    def _query_collection_batch(
+        self,
+        *,
+        collection: Any,
+        embedding_queries: List[List[float]],
+        top_k: int,
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        query_params = {
+            "query_embeddings": _as_embedding_matrix(embedding_queries),
+            "n_results": top_k,
+            "include": _QUERY_INCLUDE,
+        }
+        if where:
+            query_params["where"] = where
+        if where_document:
+            query_params["where_document"] = where_document
         results = collection.query(**query_params)
-        return self._parse_results(results)
+        return [self._parse_results(results, index=i) for i in range(len(embedding_queries))]
 
     def resolve_collection_name(self, *, embedding: List[float], metadata: Optional[Dict[str, Any]]) -> str:
         mode, model = self._identity_from_metadata(metadata)
@@ -392,7 +666,7 @@ class VectorStoreManager:
             embedding_mode=mode,
             embedding_model=model,
         )
-        self._ensure_collection(
+        collection = self._ensure_collection(
             embedding,
             embedding_mode=mode,
             embedding_model=model,
@@ -406,15 +680,23 @@ class VectorStoreManager:
             add_payload = {
                 "documents": [content],
                 "metadatas": [safe_metadata],
-                "embeddings": [embedding],
+                "embeddings": _as_embedding_matrix([embedding]),
             }
             if doc_id:
                 add_payload["ids"] = [doc_id]
-            upsert_fn = getattr(self._current_collection, "upsert", None)
+            upsert_fn = getattr(collection, "upsert", None)
             if callable(upsert_fn):
                 upsert_fn(**add_payload)
             else:
-                self._current_collection.add(**add_payload)
+                collection.add(**add_payload)
+            self._invalidate_count(collection_name)
+            if doc_id and self._prefix_index.covers(len(embedding)):
+                self._prefix_index.write(
+                    len(embedding),
+                    embedding_mode=mode,
+                    embedding_model=model,
+                    batch=[{"content": content, "metadata": metadata, "embedding": embedding, "doc_id": doc_id}],
+                )
             logger.info(
                 "Document added: id=%s size=%d dim=%d mode=%s model=%s collection=%s",
                 doc_id or "-",
@@ -429,13 +711,152 @@ class VectorStoreManager:
             logger.error("Failed to add document: %s", e, exc_info=True)
             return False
 
-    def delete_by_metadata(self, metadata_filter: Dict[str, Any]) -> int:
+    def add_documents(
+        self,
+        items: List[Dict[str, Any]],
+        *,
+        max_batch_size: int = _ADD_BATCH_SIZE,
+        verify: Optional[bool] = None,
+    ) -> int:
+        """
+        Bulk upsert of {"content", "metadata", "embedding", "doc_id"} items.
+        Items are grouped by target collection and written with one call per
+        group, split into slices of at most max_batch_size rows.
+        verify (default: only when DEBUG logging is on) reads each written slice
+        back with one get(ids=...) call and counts only the rows found.
+        Returns the number of items written.
+        """
+        if verify is None:
+            verify = logger.isEnabledFor(logging.DEBUG)
+        groups: Dict[Tuple[int, Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        for item in items:
+            embedding = item.get("embedding")
+            if embedding is None:
+                raise ValueError("Embedding is required")
+            mode, model = self._identity_from_metadata(item.get("metadata"))
+            groups.setdefault((len(embedding), mode, model), []).append(item)
+
+        batch_size = max(1, int(max_batch_size))
+        client_limit = self._client_max_batch_size()
+        if client_limit:
+            batch_size = min(batch_size, client_limit)
+        written = 0
+        for (dimension, mode, model), group in groups.items():
+            collection_name = self._get_collection_name(
+                dimension,
+                embedding_mode=mode,
+                embedding_model=model,
+            )
+            collection = self._ensure_collection_by_dim(
+                dimension,
+                embedding_mode=mode,
+                embedding_model=model,
+            )
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                if not self._write_batch(collection, collection_name=collection_name, dimension=dimension, batch=batch):
+                    continue
+                if self._prefix_index.covers(dimension):
+                    self._prefix_index.write(dimension, embedding_mode=mode, embedding_model=model, batch=batch)
+                stored = self._verify_batch(collection, collection_name=collection_name, batch=batch) if verify else len(batch)
+                written += stored
+                logger.info(
+                    "Document batch added: size=%d stored=%d dim=%d mode=%s model=%s collection=%s",
+                    len(batch),
+                    stored,
+                    dimension,
+                    mode or "-",
+                    model or "-",
+                    collection_name,
+                )
+        return written
+
+    def _client_max_batch_size(self) -> int:
+        """Largest upsert Chroma accepts in one call (one SQLite transaction), 0 if unknown; cached per manager."""
+        if self._max_batch_size is None:
+            limit = 0
+            get_limit = getattr(self.client, "get_max_batch_size", None)
+            if callable(get_limit):
+                try:
+                    limit = int(get_limit() or 0)
+                except Exception:
+                    logger.debug("Chroma max batch size unavailable", exc_info=True)
+            self._max_batch_size = max(0, limit)
+        return self._max_batch_size
+
+    def _verify_batch(self, collection: Any, *, collection_name: str, batch: List[Dict[str, Any]]) -> int:
+        ids = [item.get("doc_id") for item in batch]
+        if not all(ids):
+            return len(batch)
+        try:
+            saved = collection.get(ids=ids, include=[])
+        except Exception:
+            logger.warning("Write verification failed: collection=%s", collection_name, exc_info=True)
+            return len(batch)
+        found = len((saved or {}).get("ids") or [])
+        if found < len(ids):
+            logger.warning(
+                "Write verification mismatch: collection=%s expected=%d found=%d",
+                collection_name,
+                len(ids),
+                found,
+            )
+        return found
+
+    def _write_batch(
+        self,
+        collection: Any,
+        *,
+        collection_name: str,
+        dimension: int,
+        batch: List[Dict[str, Any]],
+    ) -> bool:
+        metadatas: List[Dict[str, Any]] = []
+        for item in batch:
+            enriched_metadata = dict(item.get("metadata") or {})
+            enriched_metadata["collection"] = collection_name
+            enriched_metadata["embedding_dimension"] = dimension
+            metadatas.append(self._sanitize(enriched_metadata, mode="storage"))
+
+        add_payload: Dict[str, Any] = {
+            "documents": [item.get("content") for item in batch],
+            "metadatas": metadatas,
+            "embeddings": _as_embedding_matrix([item["embedding"] for item in batch]),
+        }
+        ids = [item.get("doc_id") for item in batch]
+        if all(ids):
+            add_payload["ids"] = ids
+        try:
+            upsert_fn = getattr(collection, "upsert", None)
+            if callable(upsert_fn):
+                upsert_fn(**add_payload)
+            else:
+                collection.add(**add_payload)
+        except Exception as e:
+            logger.error(
+                "Failed to add document batch: size=%d collection=%s error=%s",
+                len(batch),
+                collection_name,
+                e,
+                exc_info=True,
+            )
+            return False
+        self._invalidate_count(collection_name)
+        return True
+
+    def delete_by_metadata(self, metadata_filter: Dict[str, Any], *, verify_counts: bool = False) -> int:
+        """
+        Delete rows matching metadata_filter in all known collections.
+        Returns the deleted count reported by Chroma. When the client does not
+        report it, rows are counted before/after only if verify_counts is set.
+        """
         if not metadata_filter:
             return 0
 
         safe_filter = self._sanitize(metadata_filter, mode="where")
         deleted_total = 0
         try:
+            where = self._normalize_where(safe_filter)
             collections = list(self._collections_cache.values()) + self._iter_base_collections()
             seen = set()
             for collection in collections:
@@ -445,10 +866,15 @@ class VectorStoreManager:
                         continue
                     if name:
                         seen.add(name)
-                    before = collection.count()
-                    collection.delete(where=self._normalize_where(safe_filter))
-                    after = collection.count()
-                    deleted_total += max(0, int(before - after))
+                    before = collection.count() if verify_counts else None
+                    result = collection.delete(where=where)
+                    self._invalidate_count(name)
+                    if isinstance(result, dict) and result.get("deleted") is not None:
+                        deleted_total += int(result["deleted"])
+                    elif isinstance(result, list):
+                        deleted_total += len(result)
+                    elif before is not None:
+                        deleted_total += max(0, int(before - collection.count()))
                 except Exception:
                     continue
             logger.info("Deleted by metadata filter: %s deleted=%d", safe_filter, deleted_total)
@@ -462,14 +888,51 @@ class VectorStoreManager:
         embedding_query: List[float],
         top_k: int = 5,
         filter_dict: Optional[Dict[str, Any]] = None,
-        search_all_dimensions: bool = False
+        search_all_dimensions: bool = False,
+        where_document: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        filter_dict is applied by Chroma as a metadata pre-filter and
+        where_document (e.g. {"$contains": "..."}) as a content predicate.
+        Selective filters are cheapest with the default single-dimension
+        search: search_all_dimensions fans the filtered kNN out to every
+        collection of the vector's dimension.
+        Repeated identical queries are served from a small TTL/LRU result
+        cache until the next write in this process; with a semantic threshold
+        set, near-duplicate vectors reuse the closest cached result too.
+        """
+        cache_key = self._result_cache.key(embedding_query, top_k, filter_dict, search_all_dimensions, where_document)
+        if cache_key is None:
+            return self._query_uncached(embedding_query, top_k, filter_dict, search_all_dimensions, where_document)
+        generation = VectorStoreManager._data_generation
+        cached = self._result_cache.get(cache_key, generation=generation)
+        if cached is not None:
+            return cached
+        # everything but the vector digest
+        semantic_scope = (cache_key[0],) + cache_key[2:]
+        similar = self._semantic_cache.lookup(semantic_scope, embedding_query, generation=generation)
+        if similar is not None:
+            return copy_rows(similar)
+        rows = self._query_uncached(embedding_query, top_k, filter_dict, search_all_dimensions, where_document)
+        if rows:
+            self._result_cache.put(cache_key, rows, generation=generation)
+            self._semantic_cache.store(semantic_scope, embedding_query, copy_rows(rows), generation=generation)
+        return rows
+
+    def _query_uncached(
+        self,
+        embedding_query: List[float],
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        search_all_dimensions: bool,
+        where_document: Optional[Dict[str, Any]],
     ) -> List[Dict[str, Any]]:
         dimension = len(embedding_query)
 
         if search_all_dimensions:
-            return self._query_all_dimensions(embedding_query, top_k, filter_dict)
+            return self._query_all_dimensions(embedding_query, top_k, filter_dict, where_document)
 
-        safe_filter = self._sanitize(filter_dict or {}, mode="where") if filter_dict else None
+        safe_filter, where = self._prepare_where(filter_dict)
         mode, model = self._identity_from_filter(safe_filter or {})
 
         logger.info(
@@ -478,11 +941,22 @@ class VectorStoreManager:
             top_k,
             mode or "-",
             model or "-",
-            safe_filter if safe_filter else None,
+            _FilterFingerprint(safe_filter),
         )
 
         try:
             if mode or model:
+                if self._prefix_index.covers(dimension):
+                    rows = self._prefix_index.query(
+                        embedding_query,
+                        embedding_mode=mode,
+                        embedding_model=model,
+                        top_k=top_k,
+                        where=where,
+                        where_document=where_document,
+                    )
+                    if rows is not None:
+                        return rows
                 collection = self._ensure_collection(
                     embedding_query,
                     embedding_mode=mode,
@@ -492,86 +966,202 @@ class VectorStoreManager:
                     collection=collection,
                     embedding_query=embedding_query,
                     top_k=top_k,
-                    safe_filter=safe_filter,
+                    where=where,
+                    where_document=where_document,
                 )
 
             # No explicit embedding identity in filters: query all base collections for this dimension.
-            rows: List[Dict[str, Any]] = []
-            for collection in self._iter_base_collections():
-                name = str(getattr(collection, "name", ""))
-                coll_dim = self._extract_dimension_from_name(name)
-                if coll_dim is not None and coll_dim != dimension:
-                    continue
-                try:
-                    rows.extend(
-                        self._query_collection(
-                            collection=collection,
-                            embedding_query=embedding_query,
-                            top_k=top_k,
-                            safe_filter=safe_filter,
-                        )
-                    )
-                except Exception:
-                    continue
+            rows = self._fan_out_query(
+                self._collections_for_dimension(dimension),
+                embedding_queries=[embedding_query],
+                top_k=top_k,
+                where=where,
+                where_document=where_document,
+            )[0]
 
             if not rows:
                 return []
-            rows = sorted(rows, key=lambda x: float(x.get("distance", 1e9)))[:top_k]
-            return rows
+            return heapq.nsmallest(top_k, rows, key=_distance_key)
         except Exception as e:
             logger.error("Query failed: %s", e, exc_info=True)
             return []
 
+    def query_batch(
+        self,
+        embedding_queries: List[List[float]],
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Same routing as query(), but all vectors go to Chroma in one call per
+        collection. Returns one top_k result list per query embedding.
+        """
+        if not embedding_queries:
+            return []
+        dimension = len(embedding_queries[0])
+        if any(len(embedding) != dimension for embedding in embedding_queries):
+            raise ValueError("All query embeddings must have the same dimension")
+
+        safe_filter, where = self._prepare_where(filter_dict)
+        mode, model = self._identity_from_filter(safe_filter or {})
+
+        logger.info(
+            "Query batch: size=%d dim=%d top_k=%d mode=%s model=%s filter=%s",
+            len(embedding_queries),
+            dimension,
+            top_k,
+            mode or "-",
+            model or "-",
+            _FilterFingerprint(safe_filter),
+        )
+
+        try:
+            if mode or model:
+                collection = self._ensure_collection_by_dim(
+                    dimension,
+                    embedding_mode=mode,
+                    embedding_model=model,
+                )
+                return self._query_collection_batch(
+                    collection=collection,
+                    embedding_queries=embedding_queries,
+                    top_k=top_k,
+                    where=where,
+                    where_document=where_document,
+                )
+
+            merged = self._fan_out_query(
+                self._collections_for_dimension(dimension),
+                embedding_queries=embedding_queries,
+                top_k=top_k,
+                where=where,
+                where_document=where_document,
+            )
+            return [heapq.nsmallest(top_k, rows, key=_distance_key) for rows in merged]
+        except Exception as e:
+            logger.error("Query batch failed: %s", e, exc_info=True)
+            return [[] for _ in embedding_queries]
+
+    # Async entry points: Chroma calls block, so run them in a worker thread
+    # (reads on the bounded search pool, writes on the default executor).
+    # Keyword arguments are forwarded unchanged to the sync method.
+
+    async def aadd_documents(self, items: List[Dict[str, Any]], **kwargs: Any) -> int:
+        return await asyncio.to_thread(self.add_documents, items, **kwargs)
+
+    async def adelete_by_metadata(self, metadata_filter: Dict[str, Any], **kwargs: Any) -> int:
+        return await asyncio.to_thread(self.delete_by_metadata, metadata_filter, **kwargs)
+
+    async def aquery(self, embedding_query: List[float], **kwargs: Any) -> List[Dict[str, Any]]:
+        return await run_search(self.query, embedding_query, **kwargs)
+
     def _query_all_dimensions(
         self,
         embedding_query: List[float],
         top_k: int,
-        filter_dict: Optional[Dict[str, Any]]
+        filter_dict: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        all_results: List[Dict[str, Any]] = []
-        safe_filter = self._sanitize(filter_dict or {}, mode="where") if filter_dict else None
-
-        for collection in self._iter_base_collections():
-            try:
-                all_results.extend(
-                    self._query_collection(
-                        collection=collection,
-                        embedding_query=embedding_query,
-                        top_k=top_k,
-                        safe_filter=safe_filter,
-                    )
-                )
-            except Exception:
-                continue
+        _, where = self._prepare_where(filter_dict)
+        # A query vector can only be scored against collections of its own
+        # dimension; Chroma rejects the rest, so do not send them at all.
+        all_results = self._fan_out_query(
+            self._collections_for_dimension(len(embedding_query)),
+            embedding_queries=[embedding_query],
+            top_k=top_k,
+            where=where,
+            where_document=where_document,
+        )[0]
 
         try:
-            all_results = sorted(all_results, key=lambda x: float(x.get("distance", 1e9)))[:top_k]
+            all_results = heapq.nsmallest(top_k, all_results, key=_distance_key)
         except Exception:
             all_results = all_results[:top_k]
 
         return all_results
 
-    def _parse_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _collections_for_dimension(self, dimension: int) -> List[Any]:
+        """Base collections whose name encodes `dimension` (or no dimension at all)."""
+        out: List[Any] = []
+        for collection in self._iter_base_collections():
+            name = str(getattr(collection, "name", ""))
+            if is_prefix_collection(name):
+                continue
+            if self._extract_dimension_from_name(name) in (None, dimension):
+                out.append(collection)
+        return out
+
+    def _fan_out_query(
+        self,
+        collections: List[Any],
+        *,
+        embedding_queries: List[List[float]],
+        top_k: int,
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Query every collection (concurrently when there are several) and merge
+        rows per query embedding. Collections that fail are skipped.
+        """
+        def _run(collection: Any) -> Optional[List[List[Dict[str, Any]]]]:
+            try:
+                return self._query_collection_batch(
+                    collection=collection,
+                    embedding_queries=embedding_queries,
+                    top_k=top_k,
+                    where=where,
+                    where_document=where_document,
+                )
+            except Exception:
+                return None
+
+        if len(collections) > 1:
+            # one context copy per task: request-scoped log fields follow each query
+            pool = _get_query_pool()
+            futures = [pool.submit(contextvars.copy_context().run, _run, collection) for collection in collections]
+            per_collection = (future.result() for future in futures)
+        else:
+            per_collection = map(_run, collections)
+
+        merged: List[List[Dict[str, Any]]] = [[] for _ in embedding_queries]
+        for per_query in per_collection:
+            if per_query is None:
+                continue
+            for rows, found in zip(merged, per_query):
+                rows.extend(found)
+        return merged
+
+    def _parse_results(self, results: Dict[str, Any], index: int = 0) -> List[Dict[str, Any]]:
         try:
-            ids = (results.get("ids") or [[]])[0]
-            docs = (results.get("documents") or [[]])[0]
-            metas = (results.get("metadatas") or [[]])[0]
-            dists = (results.get("distances") or [[]])[0]
+            ids = (results.get("ids") or [[]])[index]
+            docs = (results.get("documents") or [[]])[index]
+            metas = (results.get("metadatas") or [[]])[index]
+            dists = (results.get("distances") or [[]])[index]
         except Exception:
             return []
 
-        out: List[Dict[str, Any]] = []
-        for i in range(min(len(ids), len(docs), len(metas), len(dists))):
-            out.append(
-                {"id": ids[i], "content": docs[i], "metadata": metas[i] or {}, "distance": dists[i]}
-            )
-        return out
+        return [
+            {"id": doc_id, "content": doc, "metadata": meta or {}, "distance": dist}
+            for doc_id, doc, meta, dist in zip(ids, docs, metas, dists)
+        ]
 
     def _iter_base_collections(self) -> List[Any]:
         """
         Return all Chroma collections that belong to current base_collection_name.
         Works with different Chroma list_collections return types.
+        The listing is cached for _REGISTRY_TTL_SECONDS and dropped early when
+        a manager in this process opens a new collection.
         """
+        generation = VectorStoreManager._registry_generation
+        now = time.monotonic()
+        if (
+            self._all_collections_generation == generation
+            and now - self._all_collections_loaded_at < self._REGISTRY_TTL_SECONDS
+        ):
+            return list(self._all_collections_cache.values())
+
         out: List[Any] = []
         seen = set()
 
@@ -593,52 +1183,89 @@ class VectorStoreManager:
                 continue
 
             seen.add(name)
+            # Chroma 1.x lists collection handles; 0.6 listed names only.
+            if callable(getattr(item, "query", None)):
+                out.append(item)
+                continue
             try:
                 out.append(self.client.get_collection(name=name))
             except Exception:
                 logger.warning("Could not open collection %s", name, exc_info=True)
 
+        self._all_collections_cache = {str(getattr(c, "name", "")): c for c in out}
+        self._all_collections_loaded_at = now
+        self._all_collections_generation = generation
         return out
 
+    def iter_by_filter(
+        self,
+        *,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        limit_per_collection: Optional[int] = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream documents matching a metadata filter across all known base collections.
+        Each collection is read in pages of _GET_PAGE_SIZE rows, so large scans
+        never ask Chroma for more than one page at a time. None means no per-collection cap.
+        """
+        safe_filter, where = self._prepare_where(filter_dict)
+
+        # prefix-index sidecars duplicate rows of their full collection
+        collections = [
+            c for c in self._iter_base_collections() if not is_prefix_collection(str(getattr(c, "name", "")))
+        ]
+        logger.info("get_by_filter: collections=%d where=%s", len(collections), _FilterFingerprint(where))
+
+        for collection in collections:
+            fetched = 0
+            while limit_per_collection is None or fetched < limit_per_collection:
+                page = self._GET_PAGE_SIZE
+                if limit_per_collection is not None:
+                    page = min(page, limit_per_collection - fetched)
+                try:
+                    raw = collection.get(
+                        where=where,
+                        include=["documents", "metadatas"],
+                        limit=page,
+                        **({"offset": fetched} if fetched else {}),
+                    )
+                except Exception:
+                    logger.warning("Collection get failed", exc_info=True)
+                    break
+
+                ids = raw.get("ids") or []
+                docs = raw.get("documents") or []
+                metas = raw.get("metadatas") or []
+                for doc_id, doc, meta in zip(ids, docs, metas):
+                    yield {"id": doc_id, "content": doc, "metadata": meta or {}}
+
+                fetched += len(ids)
+                if len(ids) < page:
+                    break
+
     def get_by_filter(
         self,
         *,
         filter_dict: Optional[Dict[str, Any]] = None,
-        limit_per_collection: int = 1000,
+        limit_per_collection: Optional[int] = 1000,
     ) -> List[Dict[str, Any]]:
         """
         Fetch documents by metadata filter across all known base collections.
         Used for hybrid lexical retrieval and full-file analysis.
         """
-        safe_filter = self._sanitize(filter_dict or {}, mode="where") if filter_dict else None
-        where = self._normalize_where(safe_filter) if safe_filter else None
+        return list(self.iter_by_filter(filter_dict=filter_dict, limit_per_collection=limit_per_collection))
 
-        results: List[Dict[str, Any]] = []
-        collections = self._iter_base_collections()
-        logger.info("get_by_filter: collections=%d where=%s", len(collections), where if where else None)
 
-        for collection in collections:
-            try:
-                raw = collection.get(
-                    where=where,
-                    include=["documents", "metadatas"],
-                    limit=limit_per_collection,
-                )
-            except Exception:
-                logger.warning("Collection get failed", exc_info=True)
-                continue
+_default_manager: Optional[VectorStoreManager] = None
+_default_manager_lock = Lock()
 
-            ids = raw.get("ids") or []
-            docs = raw.get("documents") or []
-            metas = raw.get("metadatas") or []
-
-            for i in range(min(len(ids), len(docs), len(metas))):
-                results.append(
-                    {
-                        "id": ids[i],
-                        "content": docs[i],
-                        "metadata": metas[i] or {},
-                    }
-                )
 
-        return results
+def get_vectorstore_manager() -> VectorStoreManager:
+    """Process-wide manager built on first use, so importing services stays IO-free."""
+    global _default_manager
+    if _default_manager is not None:
+        return _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = VectorStoreManager()
+        return _default_manager
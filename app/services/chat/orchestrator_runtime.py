@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import json
 import logging
+import time
 import uuid
-from datetime import datetime
 from typing import Any, AsyncGenerator, Dict, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -22,6 +21,7 @@ from app.services.chat.orchestrator_stream_payloads import (
     build_stream_start_payload,
     build_stream_terminal_events,
     safe_stream_payload_json,
+    sse_event,
 )
 from app.services.chat.response_contract import (
     build_response_contract,
@@ -126,8 +126,7 @@ async def stream_chat_events(
     conversation_id: uuid.UUID,
     assistant_message_id: uuid.UUID,
 ) -> AsyncGenerator[str, None]:
-    full_response = ""
-    start_time = datetime.utcnow()
+    start_time = time.perf_counter()
     summary_text: Optional[str] = None
     route_telemetry: Dict[str, Any] = orchestrator._default_route_telemetry(
         route_mode=ctx["provider_mode"],
@@ -238,10 +237,12 @@ async def stream_chat_events(
             context_docs=ctx.get("context_docs") if isinstance(ctx.get("context_docs"), list) else [],
             rag_sources=ctx.get("rag_sources") if isinstance(ctx.get("rag_sources"), list) else [],
         )
+        parts: list[str] = []
         async for chunk in routed_stream.stream:
-            full_response += chunk
+            parts.append(chunk)
             if not buffer_stream_output:
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+                yield sse_event({"type": "chunk", "content": chunk})
+        full_response = "".join(parts)
 
         route_telemetry = dict(routed_stream.telemetry.as_dict())
         gate_outcome = await run_evidence_gate(
@@ -254,7 +255,7 @@ async def stream_chat_events(
         )
         full_response = gate_outcome.response_text
 
-        generation_time = (datetime.utcnow() - start_time).total_seconds()
+        generation_time = time.perf_counter() - start_time
         postprocess_events: list[dict[str, Any]] = []
         if gate_outcome.mode == "clarification":
             summary_text = None
@@ -269,13 +270,13 @@ async def stream_chat_events(
             summary_text = postprocess["summary_text"]
             postprocess_events = postprocess["stream_events"]
         if buffer_stream_output and full_response:
-            yield f"data: {json.dumps({'type': 'chunk', 'content': full_response, 'evidence_grounded': True})}\n\n"
+            yield sse_event({"type": "chunk", "content": full_response, "evidence_grounded": True})
         for event in postprocess_events:
             if buffer_stream_output and str(event.get("type") or "").strip().lower() == "final_refinement":
                 continue
-            yield f"data: {json.dumps(event)}\n\n"
+            yield sse_event(event)
         if not buffer_stream_output and gate_outcome.changed:
-            yield f"data: {json.dumps({'type': 'final_refinement', 'content': full_response, 'evidence_grounded': True})}\n\n"
+            yield sse_event({"type": "final_refinement", "content": full_response, "evidence_grounded": True})
 
         await crud_message.create_message(
             db=db,
@@ -380,12 +381,12 @@ async def run_nonstream_chat(
     ctx: Dict[str, Any],
     conversation_id: uuid.UUID,
 ) -> ChatResponse:
-    start_time = datetime.utcnow()
+    start_time = time.perf_counter()
     execution_telemetry = orchestrator._execution_telemetry(ctx)
     artifacts_payload = orchestrator._extract_artifacts(ctx)
     if orchestrator._planner_requires_clarification(ctx):
         response_text = orchestrator._clarification_text(ctx)
-        generation_time = (datetime.utcnow() - start_time).total_seconds()
+        generation_time = time.perf_counter() - start_time
         assistant_message = await crud_message.create_message(
             db=db,
             conversation_id=conversation_id,
@@ -443,7 +444,7 @@ async def run_nonstream_chat(
             if str(execution_telemetry.get("execution_route") or "") == "complex_analytics"
             else "tabular_sql_executor"
         )
-        generation_time = (datetime.utcnow() - start_time).total_seconds()
+        generation_time = time.perf_counter() - start_time
         assistant_message = await crud_message.create_message(
             db=db,
             conversation_id=conversation_id,
@@ -526,7 +527,7 @@ async def run_nonstream_chat(
             if postprocess["critic_meta"] is not None:
                 logger.info("RAG critic(non-stream, summarize=%s): %s", chat_data.summarize, postprocess["critic_meta"])
 
-        generation_time = (datetime.utcnow() - start_time).total_seconds()
+        generation_time = time.perf_counter() - start_time
 
         assistant_message = await crud_message.create_message(
             db=db,
@@ -588,7 +589,7 @@ async def run_nonstream_chat(
                 or "narrative"
             )
 
-        generation_time = (datetime.utcnow() - start_time).total_seconds()
+        generation_time = time.perf_counter() - start_time
         assistant_message = await crud_message.create_message(
             db=db,
             conversation_id=conversation_id,
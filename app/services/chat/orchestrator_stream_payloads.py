@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import json
+import time
 import uuid
-from datetime import datetime
 from typing import Any, Dict, Mapping, Optional, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,6 +15,26 @@ from app.services.chat.response_contract import (
     normalize_route_telemetry,
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(payload: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload).decode("utf-8")
+        except TypeError:
+            # e.g. non-str dict keys: let the stdlib encoder decide
+            pass
+    return json.dumps(payload)
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """One SSE `data:` frame; used per streamed token, so it avoids stdlib json when orjson is present."""
+    return "data: " + _dumps(payload) + "\n\n"
+
 
 def build_stream_contract_fields(
     *,
@@ -95,12 +115,12 @@ def build_stream_done_payload(
 
 def safe_stream_payload_json(payload: Dict[str, Any], *, logger: Any) -> str:
     try:
-        return json.dumps(payload)
+        return _dumps(payload)
     except (TypeError, ValueError):
         logger.warning("Stream payload is not JSON-serializable; sending reduced debug payload", exc_info=True)
         if "rag_debug" in payload:
             payload["rag_debug"] = {"serialization_error": True}
-        return json.dumps(payload)
+        return _dumps(payload)
 
 
 def _build_optional_debug_payload(
@@ -135,7 +155,7 @@ async def build_stream_terminal_events(
     rag_debug_ctx: Optional[Dict[str, Any]],
     response_text: str,
     model_name: str,
-    start_time: datetime,
+    start_time: float,
     default_execution_route: str,
     default_executor_status: str,
     logger: Any,
@@ -166,9 +186,9 @@ async def build_stream_terminal_events(
     )
     events = [f"data: {safe_stream_payload_json(start_payload, logger=logger)}\n\n"]
     if response_text:
-        events.append(f"data: {json.dumps({'type': 'chunk', 'content': response_text})}\n\n")
+        events.append(sse_event({"type": "chunk", "content": response_text}))
 
-    generation_time = (datetime.utcnow() - start_time).total_seconds()
+    generation_time = time.perf_counter() - start_time
     await crud_message.create_message(
         db=db,
         conversation_id=conversation_id,
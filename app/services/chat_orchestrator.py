@@ -285,6 +285,12 @@ class ChatOrchestrator:
                     include_assistant=include_assistant,
                 )
 
+            # End the read transaction opened by history/RAG lookups so its pooled
+            # connection is not held for the seconds-long generation that follows;
+            # the next write (assistant message) checks out a connection again.
+            if isinstance(db, AsyncSession) and db.in_transaction():
+                await db.commit()
+
             return {
                 "conversation_id": conversation_id,
                 **provider_selection,
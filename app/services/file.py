@@ -27,8 +27,8 @@ from app.db.models.file_processing import FileProcessingProfile
 from app.db.session import AsyncSessionLocal
 from app.rag.document_loader import DocumentLoader
 from app.rag.embeddings import EmbeddingsManager
-from app.rag.text_splitter import SmartTextSplitter
-from app.rag.vector_store import VectorStoreManager
+from app.rag.text_splitter import get_splitter
+from app.rag.vector_store import get_vectorstore_manager
 from app.observability.context import file_id_ctx
 from app.observability.context import request_id_ctx
 from app.observability.file_lifecycle import log_file_lifecycle_event
@@ -49,8 +49,8 @@ from app.services.tabular.storage_adapter import build_tabular_dataset_metadata
 logger = logging.getLogger(__name__)
 
 document_loader = DocumentLoader()
-text_splitter = SmartTextSplitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
-vector_store = VectorStoreManager()
+text_splitter = get_splitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
+vector_store = get_vectorstore_manager()
 
 _ingestion_worker: Optional[DurableIngestionWorker] = None
 _ingestion_worker_lock = asyncio.Lock()
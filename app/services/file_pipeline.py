@@ -512,7 +512,7 @@ async def process_file_pipeline(
             if file_ext in ("xlsx", "xls", "csv", "tsv"):
                 chunks = docs
             else:
-                chunks = text_splitter_obj.split_documents(docs)
+                chunks = await text_splitter_obj.asplit_documents(docs)
                 # Keep a compact file-level summary chunk for selective indexing in narrative docs.
                 summary_lines: List[str] = []
                 for d in docs[:4]:
@@ -658,7 +658,7 @@ async def process_file_pipeline(
             if resume_batch_index <= 1:
                 try:
                     if processing_id is not None:
-                        deleted = vector_store_obj.delete_by_metadata({"processing_id": str(processing_id)})
+                        deleted = await vector_store_obj.adelete_by_metadata({"processing_id": str(processing_id)})
                         logger_obj.info(
                             "Pre-clean vector store by processing_id=%s file_id=%s deleted=%d",
                             processing_id,
@@ -666,7 +666,7 @@ async def process_file_pipeline(
                             deleted,
                         )
                     else:
-                        deleted = vector_store_obj.delete_by_metadata({"file_id": str(file_id)})
+                        deleted = await vector_store_obj.adelete_by_metadata({"file_id": str(file_id)})
                         logger_obj.info("Pre-clean vector store by file_id=%s deleted=%d", file_id, deleted)
                 except Exception:
                     logger_obj.warning("Vector pre-clean failed (continue)", exc_info=True)
@@ -772,8 +772,9 @@ async def process_file_pipeline(
                     logger_obj.warning("Embedding batch %d/%d invalid vectors size", i, len(batches))
                     continue
 
-                for vec, (text, meta, doc_id) in zip(vectors, batch):
-                    try:
+                try:
+                    batch_items: List[Dict[str, Any]] = []
+                    for vec, (text, meta, doc_id) in zip(vectors, batch):
                         observed_embedding_dimension = int(len(vec))
                         meta["embedding_dimension"] = observed_embedding_dimension
                         meta["collection"] = vector_store_obj.resolve_collection_name(
@@ -791,29 +792,29 @@ async def process_file_pipeline(
                                 meta["collection"],
                             )
                             target_collection_logged = True
-                        ok = vector_store_obj.add_document(
-                            doc_id=doc_id,
-                            embedding=vec,
-                            metadata=meta,
-                            content=text,
+                        batch_items.append({"content": text, "metadata": meta, "embedding": vec, "doc_id": doc_id})
+                    written = int(await vector_store_obj.aadd_documents(batch_items) or 0)
+                    progress["chunks_indexed"] = int(progress["chunks_indexed"]) + written
+                    progress["vector_upserts_actual"] = int(progress["vector_upserts_actual"]) + written
+                    progress["chunks_failed"] = int(progress["chunks_failed"]) + (len(batch) - written)
+                    progress["chunks_processed"] = int(progress["chunks_processed"]) + len(batch)
+                    if written < len(batch):
+                        logger_obj.warning(
+                            "Vector batch upsert incomplete: batch=%d/%d written=%d expected=%d",
+                            i,
+                            len(batches),
+                            written,
+                            len(batch),
                         )
-                        if ok:
-                            progress["chunks_indexed"] = int(progress["chunks_indexed"]) + 1
-                            progress["chunks_processed"] = int(progress["chunks_processed"]) + 1
-                            progress["vector_upserts_actual"] = int(progress["vector_upserts_actual"]) + 1
-                        else:
-                            progress["chunks_failed"] = int(progress["chunks_failed"]) + 1
-                            progress["chunks_processed"] = int(progress["chunks_processed"]) + 1
-                            logger_obj.warning("Vector upsert returned False doc_id=%s", doc_id)
-                    except Exception as upsert_exc:
-                        progress["chunks_failed"] = int(progress["chunks_failed"]) + 1
-                        progress["chunks_processed"] = int(progress["chunks_processed"]) + 1
-                        classified = classify_ingestion_exception(upsert_exc)
-                        progress["failure_code"] = classified["code"]
-                        if classified["fatal"]:
-                            progress["fatal_error"] = True
-                            raise
-                        logger_obj.warning("Vector upsert failed doc_id=%s", doc_id, exc_info=True)
+                except Exception as upsert_exc:
+                    progress["chunks_failed"] = int(progress["chunks_failed"]) + len(batch)
+                    progress["chunks_processed"] = int(progress["chunks_processed"]) + len(batch)
+                    classified = classify_ingestion_exception(upsert_exc)
+                    progress["failure_code"] = classified["code"]
+                    if classified["fatal"]:
+                        progress["fatal_error"] = True
+                        raise
+                    logger_obj.warning("Vector batch upsert failed batch=%d/%d", i, len(batches), exc_info=True)
                 progress["checkpoint"] = {"next_batch_index": i + 1, "batch_size": batch_size}
                 await _checkpoint(
                     status="indexing" if i < len(batches) else "embedding",
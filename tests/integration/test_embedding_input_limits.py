@@ -20,8 +20,7 @@ def test_local_embedding_inputs_are_segmented_without_lossy_truncation(monkeypat
     result = asyncio.run(mgr.embedd_documents_async(["x" * 400, "ok"]))
 
     assert len(result) == 2
-    # long text should be segmented: 120,120,120,100
-    assert seen_lengths[:4] == [120, 120, 120, 100]
-    assert seen_lengths[4] == 2
+    # long text should be segmented: 120,120,120,100 (segments and texts are embedded concurrently)
+    assert sorted(seen_lengths) == [2, 100, 120, 120, 120]
     # first embedding is mean pooled over segments
     assert abs(result[0][0] - 115.0) < 1e-6
@@ -193,7 +193,7 @@ def test_process_file_auth_error_marks_failed_without_retry(monkeypatch):
     monkeypatch.setattr(file_service.crud_file, "get", fake_get_file)
     monkeypatch.setattr(file_service, "EmbeddingsManager", AuthFailEmb)
     monkeypatch.setattr(file_service.vector_store, "delete_by_metadata", lambda f: 0)  # noqa: ARG005
-    monkeypatch.setattr(file_service.vector_store, "add_document", lambda **kwargs: True)  # noqa: ANN003
+    monkeypatch.setattr(file_service.vector_store, "add_documents", lambda items: len(items))
 
     ok, retryable = asyncio.run(
         file_service._process_file(
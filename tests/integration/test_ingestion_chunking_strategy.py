@@ -62,8 +62,8 @@ def test_spreadsheet_uses_loader_blocks_without_text_split(monkeypatch):
         async def embedd_documents_async(self, texts):
             return [[0.1, 0.2, 0.3] for _ in texts]
 
-    def fake_add_document(**kwargs):  # noqa: ANN003
-        return True
+    def fake_add_documents(items):
+        return len(items)
 
     async def fake_finalize_ingestion(**kwargs):
         captured["progress"] = kwargs["progress"]
@@ -76,7 +76,7 @@ def test_spreadsheet_uses_loader_blocks_without_text_split(monkeypatch):
     monkeypatch.setattr(file_service.crud_file, "get", fake_get_file)
     monkeypatch.setattr(file_service, "EmbeddingsManager", FakeEmb)
     monkeypatch.setattr(file_service.vector_store, "delete_by_metadata", lambda f: 0)  # noqa: ARG005
-    monkeypatch.setattr(file_service.vector_store, "add_document", fake_add_document)
+    monkeypatch.setattr(file_service.vector_store, "add_documents", fake_add_documents)
     monkeypatch.setattr(file_service, "_finalize_ingestion", fake_finalize_ingestion)
 
     ok, _retryable = asyncio.run(
@@ -148,7 +148,7 @@ def test_ingestion_emits_stage_status_transitions(monkeypatch):
     monkeypatch.setattr(file_service.crud_file, "get", fake_get_file)
     monkeypatch.setattr(file_service, "EmbeddingsManager", FakeEmb)
     monkeypatch.setattr(file_service.vector_store, "delete_by_metadata", lambda f: 0)  # noqa: ARG005
-    monkeypatch.setattr(file_service.vector_store, "add_document", lambda **kwargs: True)  # noqa: ANN003
+    monkeypatch.setattr(file_service.vector_store, "add_documents", lambda items: len(items))
 
     ok, retryable = asyncio.run(
         file_service._process_file(
@@ -216,9 +216,9 @@ def test_ingestion_accepts_small_non_empty_text_and_sets_namespace(monkeypatch):
         async def embedd_documents_async(self, texts):
             return [[0.1, 0.2, 0.3] for _ in texts]
 
-    def fake_add_document(**kwargs):  # noqa: ANN003
-        captured["metadata"].append(dict(kwargs.get("metadata") or {}))
-        return True
+    def fake_add_documents(items):
+        captured["metadata"].extend(dict(item.get("metadata") or {}) for item in items)
+        return len(items)
 
     async def fake_finalize_ingestion(**kwargs):
         captured["progress"] = kwargs["progress"]
@@ -231,7 +231,7 @@ def test_ingestion_accepts_small_non_empty_text_and_sets_namespace(monkeypatch):
     monkeypatch.setattr(file_service.crud_file, "get", fake_get_file)
     monkeypatch.setattr(file_service, "EmbeddingsManager", FakeEmb)
     monkeypatch.setattr(file_service.vector_store, "delete_by_metadata", lambda f: 0)  # noqa: ARG005
-    monkeypatch.setattr(file_service.vector_store, "add_document", fake_add_document)
+    monkeypatch.setattr(file_service.vector_store, "add_documents", fake_add_documents)
     monkeypatch.setattr(file_service, "_finalize_ingestion", fake_finalize_ingestion)
 
     ok, retryable = asyncio.run(
@@ -79,10 +79,10 @@ def test_ingestion_persists_derived_artifacts_and_vector_metadata(monkeypatch, t
         async def embedd_documents_async(self, texts):
             return [[0.1, 0.2, 0.3] for _ in texts]
 
-    def fake_add_document(**kwargs):  # noqa: ANN003
-        if captured["vector_meta"] is None:
-            captured["vector_meta"] = dict(kwargs.get("metadata") or {})
-        return True
+    def fake_add_documents(items):
+        if captured["vector_meta"] is None and items:
+            captured["vector_meta"] = dict(items[0].get("metadata") or {})
+        return len(items)
 
     async def fake_finalize_ingestion(**kwargs):
         captured["finalize_kwargs"] = kwargs
@@ -95,7 +95,7 @@ def test_ingestion_persists_derived_artifacts_and_vector_metadata(monkeypatch, t
     monkeypatch.setattr(file_service.crud_file, "get", fake_get_file)
     monkeypatch.setattr(file_service, "EmbeddingsManager", FakeEmb)
     monkeypatch.setattr(file_service.vector_store, "delete_by_metadata", lambda f: 0)  # noqa: ARG005
-    monkeypatch.setattr(file_service.vector_store, "add_document", fake_add_document)
+    monkeypatch.setattr(file_service.vector_store, "add_documents", fake_add_documents)
     monkeypatch.setattr(file_service, "_finalize_ingestion", fake_finalize_ingestion)
 
     ok, retryable = asyncio.run(
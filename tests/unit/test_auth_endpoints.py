@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import auth as auth_endpoint
+from app.core import security
+from app.schemas import PasswordChange, UserCreate
+
+
+def _install_fake_crud(monkeypatch, existing):
+    calls = {"lookups": 0, "created": 0}
+
+    async def fake_lookup(db, *, username, email):  # noqa: ANN001, ARG001
+        calls["lookups"] += 1
+        return [user for user in existing if user.username == username or user.email == email]
+
+    async def fake_create(db, *, obj_in):  # noqa: ANN001, ARG001
+        calls["created"] += 1
+        return SimpleNamespace(username=obj_in.username, email=obj_in.email)
+
+    monkeypatch.setattr(
+        auth_endpoint,
+        "crud_user",
+        SimpleNamespace(get_by_username_or_email=fake_lookup, create=fake_create),
+    )
+    return calls
+
+
+def _user_in() -> UserCreate:
+    return UserCreate(username="alice", email="alice@example.com", password="password123")
+
+
+@pytest.mark.parametrize(
+    ("existing", "detail"),
+    [
+        ([SimpleNamespace(username="alice", email="other@example.com")], "Username already taken"),
+        ([SimpleNamespace(username="bob", email="alice@example.com")], "Email already registered"),
+        (
+            [
+                SimpleNamespace(username="alice", email="other@example.com"),
+                SimpleNamespace(username="bob", email="alice@example.com"),
+            ],
+            "Email already registered",
+        ),
+    ],
+)
+def test_register_checks_username_and_email_with_one_lookup(monkeypatch, existing, detail):
+    calls = _install_fake_crud(monkeypatch, existing)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth_endpoint.register(user_in=_user_in(), db=None))
+
+    assert exc_info.value.detail == detail
+    assert calls == {"lookups": 1, "created": 0}
+
+
+def test_register_creates_user_when_username_and_email_are_free(monkeypatch):
+    calls = _install_fake_crud(monkeypatch, [SimpleNamespace(username="bob", email="bob@example.com")])
+
+    user = asyncio.run(auth_endpoint.register(user_in=_user_in(), db=None))
+
+    assert user.username == "alice"
+    assert calls == {"lookups": 1, "created": 1}
+
+
+def test_change_password_hashes_off_the_event_loop_thread(monkeypatch):
+    threads = []
+    real_hasher = auth_endpoint.security.ph
+
+    class _RecordingHasher:
+        def verify(self, hashed, plain):  # noqa: ANN001
+            threads.append(threading.current_thread())
+            return real_hasher.verify(hashed, plain)
+
+        def hash(self, password):  # noqa: ANN001
+            threads.append(threading.current_thread())
+            return real_hasher.hash(password)
+
+    old_hash = real_hasher.hash("password123")
+    monkeypatch.setattr(auth_endpoint.security, "ph", _RecordingHasher())
+    user = SimpleNamespace(username="alice", password_hash=old_hash)
+
+    class _FakeDB:
+        async def commit(self):
+            return None
+
+    payload = PasswordChange(old_password="password123", new_password="password456")
+    result = asyncio.run(auth_endpoint.change_password(password_data=payload, db=_FakeDB(), current_user=user))
+
+    assert result == {"message": "Password updated successfully"}
+    assert real_hasher.verify(user.password_hash, "password456")
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_current_user_row_is_cached_briefly_and_reattached_to_the_session(monkeypatch):
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    from app.api import dependencies
+    from app.db.models import User
+
+    lookups = []
+
+    async def fake_get_by_username(db, *, username):  # noqa: ANN001, ARG001
+        lookups.append(username)
+        return User(id=uuid.uuid4(), username=username, email="a@example.com", password_hash="h", is_active=True)
+
+    class _FakeSession:
+        merged = 0
+
+        async def merge(self, instance, load=True):  # noqa: ANN001
+            assert load is False
+            self.merged += 1
+            return instance
+
+    monkeypatch.setattr(dependencies, "crud_user", SimpleNamespace(get_by_username=fake_get_by_username))
+    monkeypatch.setattr(dependencies, "_user_cache", {})
+    monkeypatch.setattr(dependencies.settings, "AUTH_USER_CACHE_TTL_SECONDS", 30.0)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=security.create_access_token("alice"))
+    db = _FakeSession()
+
+    first = asyncio.run(dependencies.get_current_user(credentials=credentials, db=db))
+    second = asyncio.run(dependencies.get_current_user(credentials=credentials, db=db))
+
+    assert lookups == ["alice"] and db.merged == 1
+    assert second is not first and (second.id, second.username) == (first.id, first.username)
+
+    dependencies.invalidate_cached_user("alice")
+    asyncio.run(dependencies.get_current_user(credentials=credentials, db=db))
+    assert lookups == ["alice", "alice"]
+
+
+def test_decode_access_token_requires_sub_and_exp():
+    assert security.decode_access_token(security.create_access_token("alice"))["sub"] == "alice"
+
+    no_exp = security.jwt.encode({"sub": "alice"}, security.SECRET_KEY, algorithm=security.ALGORITHM)
+    no_sub = security.jwt.encode({"exp": 4102444800}, security.SECRET_KEY, algorithm=security.ALGORITHM)
+    assert security.decode_access_token(no_exp) is None
+    assert security.decode_access_token(no_sub) is None
+
+
+def test_authenticate_unknown_user_still_runs_password_verification(monkeypatch):
+    from app.crud import user as crud_user_module
+
+    burned = []
+
+    async def fake_get_by_username(db, *, username):  # noqa: ANN001, ARG001
+        return None
+
+    async def fake_burn(password):  # noqa: ANN001
+        burned.append(password)
+
+    monkeypatch.setattr(crud_user_module.crud_user, "get_by_username", fake_get_by_username)
+    monkeypatch.setattr(crud_user_module, "burn_password_verification_async", fake_burn)
+
+    result = asyncio.run(crud_user_module.crud_user.authenticate(None, username="ghost", password="secret"))
+
+    assert result is None
+    assert burned == ["secret"]
+    security.burn_password_verification("secret")
+
+
+def test_get_by_username_binds_username_into_cached_lambda_statement():
+    from app.crud.user import crud_user
+
+    statements = []
+
+    class _Result:
+        def scalar_one_or_none(self):
+            return None
+
+    class _Session:
+        async def execute(self, statement):  # noqa: ANN001
+            statements.append(statement)
+            return _Result()
+
+    for name in ("alice", "bob"):
+        asyncio.run(crud_user.get_by_username(_Session(), username=name))
+
+    first, second = (stmt.compile() for stmt in statements)
+    assert str(first) == str(second) and "users.username = :" in str(first)
+    assert list(first.params.values()) == ["alice"] and list(second.params.values()) == ["bob"]
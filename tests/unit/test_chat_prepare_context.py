@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas import ChatMessage
+from app.services import chat_orchestrator as orchestrator_module
+from app.services.chat_orchestrator import ChatOrchestrator
+
+
+class _TrackingSession(AsyncSession):
+    def __init__(self):
+        super().__init__()
+        self.events: list[str] = []
+        self.open_transaction = False
+
+    def in_transaction(self) -> bool:
+        return self.open_transaction
+
+    async def commit(self) -> None:
+        self.events.append("commit")
+        self.open_transaction = False
+
+
+def test_prepare_request_context_releases_read_transaction_before_generation(monkeypatch):
+    user_id = uuid.uuid4()
+    conversation_id = uuid.uuid4()
+    db = _TrackingSession()
+
+    async def fake_get_conversation(db, id):  # noqa: ARG001, A002
+        return SimpleNamespace(id=conversation_id, user_id=user_id, model_source="local", model_name="llama-test")
+
+    async def fake_create_message(db, conversation_id, role, content, **kwargs):  # noqa: ARG001
+        db.events.append("create_message")
+
+    async def fake_get_last_messages(db, conversation_id, count):  # noqa: ARG001
+        db.open_transaction = True
+        return [SimpleNamespace(role="user", content="hello")]
+
+    async def fake_build_rag_prompt(**kwargs):  # noqa: ANN003
+        db.events.append("rag")
+        return kwargs["query"], False, None, [], [], []
+
+    monkeypatch.setattr(orchestrator_module.crud_conversation, "get", fake_get_conversation)
+    monkeypatch.setattr(orchestrator_module.crud_message, "create_message", fake_create_message)
+    monkeypatch.setattr(orchestrator_module.crud_message, "get_last_messages", fake_get_last_messages)
+    monkeypatch.setattr(orchestrator_module, "build_rag_prompt", fake_build_rag_prompt)
+
+    ctx = asyncio.run(
+        ChatOrchestrator()._prepare_request_context(
+            chat_data=ChatMessage(message="hello", conversation_id=conversation_id, model_source="local"),
+            db=db,
+            user_id=user_id,
+        )
+    )
+
+    assert ctx["conversation_id"] == conversation_id
+    assert db.events == ["create_message", "rag", "commit"]
+    assert not db.in_transaction()
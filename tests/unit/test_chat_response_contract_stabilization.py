@@ -1,9 +1,10 @@
+import json
 import uuid
 
 from app.services.chat.orchestrator_runtime import (
     _build_chat_response,
 )
-from app.services.chat.orchestrator_stream_payloads import build_stream_contract_fields
+from app.services.chat.orchestrator_stream_payloads import build_stream_contract_fields, sse_event
 
 
 def _build_response(
@@ -276,3 +277,11 @@ def test_scope_ambiguity_clarification_keeps_response_contract_stable():
     assert contract.retrieval_mode == "tabular_sql"
     assert contract.clarification_required is True
     assert contract.controlled_fallback is True
+
+
+def test_sse_event_frames_valid_json_for_quotes_newlines_and_unicode():
+    frame = sse_event({"type": "chunk", "content": "it's \"quoted\"\nПривет"})
+
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    assert json.loads(frame[len("data: "):]) == {"type": "chunk", "content": "it's \"quoted\"\nПривет"}
+    assert json.loads(sse_event({1: "non-str key"})[len("data: "):]) == {"1": "non-str key"}
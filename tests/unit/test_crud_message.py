@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app.crud.message import crud_message
+from app.db.models.conversation import Conversation
+
+
+class _FakeSession:
+    def __init__(self, conversation):
+        self.conversation = conversation
+        self.added = []
+        self.commits = 0
+        self.gets = []
+
+    def add(self, obj):  # noqa: ANN001
+        self.added.append(obj)
+
+    async def get(self, model, ident):  # noqa: ANN001
+        self.gets.append((model, ident))
+        return self.conversation
+
+    async def commit(self):
+        self.commits += 1
+
+    async def refresh(self, obj):  # noqa: ANN001
+        raise AssertionError("create_message should not refresh")
+
+
+def test_create_message_updates_conversation_in_one_commit():
+    conversation_id = uuid.uuid4()
+    conversation = SimpleNamespace(message_count=2, updated_at=None)
+    db = _FakeSession(conversation)
+
+    message = asyncio.run(
+        crud_message.create_message(db, conversation_id=conversation_id, role="user", content="hi")
+    )
+
+    assert db.added == [message] and message.content == "hi"
+    assert db.gets == [(Conversation, conversation_id)]
+    assert conversation.message_count == 3 and conversation.updated_at is not None
+    assert db.commits == 1
+
+
+def test_get_last_messages_selects_only_role_and_content():
+    statements = []
+
+    class _Result:
+        def all(self):
+            return [("assistant", "second"), ("user", "first")]
+
+    class _Session:
+        async def execute(self, statement):  # noqa: ANN001
+            statements.append(statement)
+            return _Result()
+
+    rows = asyncio.run(crud_message.get_last_messages(_Session(), conversation_id=uuid.uuid4(), count=2))
+
+    assert rows == [("user", "first"), ("assistant", "second")]
+    assert [column.name for column in statements[0].selected_columns] == ["role", "content"]
@@ -70,3 +70,59 @@ def test_dimension_mismatch_fails_with_clear_error(monkeypatch):
     manager = EmbeddingsManager(mode="aihub", model="qwen3-emb")
     with pytest.raises(RuntimeError, match="expected=4096 actual=1024"):
         asyncio.run(manager.embedd_documents_async(["hello"]))
+
+
+def test_local_long_text_segments_are_embedded_concurrently_in_order(monkeypatch):
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDINGS_DIM", 0)
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDING_MODEL_DIMENSIONS", "local:nomic-embed-text:latest=2")
+    monkeypatch.setattr(embeddings_module.settings, "OLLAMA_EMBED_MAX_INPUT_CHARS", 4)
+    monkeypatch.setattr(embeddings_module.settings, "OLLAMA_EMBED_SEGMENT_OVERLAP_CHARS", 1)
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDING_CONCURRENCY", 4)
+    _reset_provider_registry(monkeypatch)
+    in_flight = {"now": 0, "peak": 0}
+
+    async def _fake_generate_embedding(*, text, model_source=None, model_name=None):  # noqa: ARG001
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return [float(len(text)), 1.0 if text.startswith("a") else 0.0]
+
+    monkeypatch.setattr(embeddings_module.llm_manager, "generate_embedding", _fake_generate_embedding)
+
+    manager = EmbeddingsManager(mode="local", model="nomic-embed-text:latest")
+    vectors = asyncio.run(manager.embedd_documents_async(["aaaabbbbcc"]))
+
+    assert in_flight["peak"] == 3
+    # segments "aaaa", "abbb", "bbbc" are mean pooled in input order
+    assert vectors == [[pytest.approx(4.0), pytest.approx(2 / 3)]]
+
+
+def test_get_embeddings_manager_shares_one_instance_per_mode_and_model():
+    first = embeddings_module.get_embeddings_manager(mode="LOCAL", model="nomic-embed-text:latest")
+
+    assert first is embeddings_module.get_embeddings_manager(mode="local", model="nomic-embed-text:latest")
+    assert first is not embeddings_module.get_embeddings_manager(mode="local", model="other")
+    assert first.mode == "local" and first.model == "nomic-embed-text:latest"
+
+
+def test_embed_query_async_reuses_recent_query_vectors(monkeypatch):
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDINGS_QUERY_CACHE_SIZE", 1)
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDINGS_QUERY_CACHE_TTL_SECONDS", 60.0)
+    manager = EmbeddingsManager(mode="local", model="nomic-embed-text:latest")
+    calls = []
+
+    async def _fake_embed(texts):
+        calls.append(list(texts))
+        return [[float(len(texts[0])), 1.0]]
+
+    monkeypatch.setattr(manager, "embedd_documents_async", _fake_embed)
+
+    first = asyncio.run(manager.embed_query_async("hello"))
+    first.append(99.0)
+    assert asyncio.run(manager.embed_query_async("hello")) == [5.0, 1.0]
+    assert calls == [["hello"]]
+
+    asyncio.run(manager.embed_query_async("other"))
+    asyncio.run(manager.embed_query_async("hello"))
+    assert calls == [["hello"], ["other"], ["hello"]]
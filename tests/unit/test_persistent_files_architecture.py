@@ -457,7 +457,7 @@ def test_delete_file_lifecycle(monkeypatch, tmp_path: Path):
             return 0
 
         class FakeVectorStore:
-            def delete_by_metadata(self, metadata_filter):
+            async def adelete_by_metadata(self, metadata_filter):
                 assert metadata_filter.get("file_id") == str(file_id)
                 calls["vector_delete"] += 1
                 return 0
@@ -471,7 +471,7 @@ def test_delete_file_lifecycle(monkeypatch, tmp_path: Path):
 
         monkeypatch.setattr(files_endpoint, "_get_user_file_or_404", fake_get_file)
         monkeypatch.setattr(files_endpoint, "cleanup_tabular_artifacts_for_file", lambda *args, **kwargs: None)
-        monkeypatch.setattr(files_endpoint, "VectorStoreManager", FakeVectorStore)
+        monkeypatch.setattr(files_endpoint, "get_vectorstore_manager", FakeVectorStore)
         monkeypatch.setattr(
             files_endpoint,
             "crud_file",
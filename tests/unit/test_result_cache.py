@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from app.rag import result_cache as result_cache_module
+from app.rag.result_cache import QueryResultCache
+
+
+def _rows(*ids: str):
+    return [{"id": doc_id, "metadata": {"file_id": "f1"}, "distance": 0.1} for doc_id in ids]
+
+
+def test_key_covers_vector_top_k_and_predicates_and_is_none_when_disabled():
+    cache = QueryResultCache(max_entries=4, ttl_seconds=60.0)
+    key = cache.key([0.1, 0.2], 5, {"file_id": "f1"}, False, None)
+
+    assert key == cache.key([0.1, 0.2], 5, {"file_id": "f1"}, False, None)
+    assert key != cache.key([0.1, 0.3], 5, {"file_id": "f1"}, False, None)
+    assert key != cache.key([0.1, 0.2], 4, {"file_id": "f1"}, False, None)
+    assert key != cache.key([0.1, 0.2], 5, {"file_id": "f2"}, False, None)
+    assert QueryResultCache(max_entries=0, ttl_seconds=60.0).key([0.1], 5, None, False, None) is None
+
+
+def test_get_returns_copies_until_generation_or_ttl_moves(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: clock["now"])
+    cache = QueryResultCache(max_entries=4, ttl_seconds=10.0)
+    cache.put("k", _rows("a"), generation=1)
+
+    first = cache.get("k", generation=1)
+    first[0]["metadata"]["annotated"] = True
+    assert "annotated" not in cache.get("k", generation=1)[0]["metadata"]
+
+    assert cache.get("k", generation=2) is None
+    assert cache.get("k", generation=1) is None
+
+    cache.put("k", _rows("a"), generation=2)
+    clock["now"] += 10.0
+    assert cache.get("k", generation=2) is None
+
+
+def test_put_evicts_least_recently_used_entry():
+    cache = QueryResultCache(max_entries=2, ttl_seconds=60.0)
+    cache.put("a", _rows("a"), generation=1)
+    cache.put("b", _rows("b"), generation=1)
+    assert cache.get("a", generation=1) is not None
+
+    cache.put("c", _rows("c"), generation=1)
+
+    assert cache.get("b", generation=1) is None
+    assert [row["id"] for row in cache.get("a", generation=1)] == ["a"]
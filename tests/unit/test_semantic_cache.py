@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from app.rag import semantic_cache as semantic_cache_module
+from app.rag.semantic_cache import SemanticCache
+
+
+def _cache(**overrides) -> SemanticCache:
+    params = {"threshold": 0.95, "max_entries": 4, "ttl_seconds": 60.0}
+    params.update(overrides)
+    return SemanticCache(**params)
+
+
+def test_lookup_returns_closest_payload_above_threshold_within_scope():
+    cache = _cache()
+    cache.store("scope", [1.0, 0.0, 0.0], "x-axis", generation=1)
+    cache.store("scope", [0.0, 1.0, 0.0], "y-axis", generation=1)
+
+    assert cache.lookup("scope", [2.0, 0.1, 0.0], generation=1) == "x-axis"
+    assert cache.lookup("scope", [0.05, 1.0, 0.0], generation=1) == "y-axis"
+    assert cache.lookup("scope", [1.0, 1.0, 0.0], generation=1) is None
+    assert cache.lookup("other", [1.0, 0.0, 0.0], generation=1) is None
+    assert cache.lookup("scope", [1.0, 0.0], generation=1) is None
+    assert cache.lookup("scope", [0.0, 0.0, 0.0], generation=1) is None
+
+
+def test_generation_change_drops_entries_and_ignores_stale_writes():
+    cache = _cache()
+    cache.store("scope", [1.0, 0.0], "old", generation=1)
+
+    assert cache.lookup("scope", [1.0, 0.0], generation=2) is None
+    cache.store("scope", [1.0, 0.0], "computed-before-write", generation=1)
+    assert cache.lookup("scope", [1.0, 0.0], generation=2) is None
+
+    cache.store("scope", [1.0, 0.0], "fresh", generation=2)
+    assert cache.lookup("scope", [1.0, 0.0], generation=2) == "fresh"
+
+
+def test_size_bound_evicts_oldest_entries_of_least_recent_scope(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(semantic_cache_module.time, "monotonic", lambda: clock["now"])
+    cache = _cache(max_entries=3, ttl_seconds=10.0)
+    cache.store("a", [1.0, 0.0], "a1", generation=1)
+    cache.store("a", [0.0, 1.0], "a2", generation=1)
+    cache.store("b", [1.0, 0.0], "b1", generation=1)
+    cache.store("b", [0.0, 1.0], "b2", generation=1)
+
+    assert cache.lookup("a", [1.0, 0.0], generation=1) is None
+    assert cache.lookup("a", [0.0, 1.0], generation=1) == "a2"
+    assert cache.lookup("b", [1.0, 0.0], generation=1) == "b1"
+
+    clock["now"] += 10.0
+    assert cache.lookup("b", [0.0, 1.0], generation=1) is None
+
+
+def test_disabled_cache_is_a_no_op():
+    cache = _cache(threshold=0.0)
+    cache.store("scope", [1.0, 0.0], "payload", generation=1)
+
+    assert not cache.enabled
+    assert cache.lookup("scope", [1.0, 0.0], generation=1) is None
@@ -0,0 +1,122 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from app.rag.text_splitter import SmartTextSplitter, get_splitter
+
+
+def test_get_splitter_reuses_instance_per_config():
+    first = get_splitter(chunk_size=400, chunk_overlap=50)
+    second = get_splitter(chunk_size=400, chunk_overlap=50)
+    assert first is second
+    assert isinstance(first, SmartTextSplitter)
+
+
+def test_get_splitter_keys_on_separators_and_validates_once():
+    custom = get_splitter(chunk_size=400, chunk_overlap=50, separators=["\n", " "])
+    assert custom is not get_splitter(chunk_size=400, chunk_overlap=50)
+    assert custom is get_splitter(chunk_size=400, chunk_overlap=50, separators=["\n", " "])
+    assert custom.separators == ["\n", " "]
+
+    bumped = get_splitter(chunk_size=10, chunk_overlap=20)
+    assert bumped.chunk_size == 50
+    assert bumped.chunk_overlap < bumped.chunk_size
+
+
+def test_split_documents_stamps_chunk_metadata_per_source_document():
+    splitter = SmartTextSplitter(chunk_size=60, chunk_overlap=0)
+    docs = [
+        Document(page_content="alpha beta gamma. " * 10, metadata={"source": "a.txt", "file_type": "txt"}),
+        Document(page_content="row line\n" * 20, metadata={"source": "b.csv", "file_type": "csv"}),
+    ]
+
+    chunks = splitter.split_documents(docs)
+
+    for doc_idx, source in enumerate(["a.txt", "b.csv"]):
+        own = [c for c in chunks if c.metadata["doc_index"] == doc_idx]
+        assert len(own) > 1
+        assert [c.metadata["chunk_index"] for c in own] == list(range(len(own)))
+        assert all(c.metadata["total_chunks"] == len(own) for c in own)
+        assert all(c.metadata["source"] == source for c in own)
+        assert all(c.metadata["chunk_size"] == len(c.page_content) for c in own)
+    assert "chunk_index" not in docs[0].metadata
+
+
+def test_split_by_file_type_reuses_splitter_per_file_type():
+    splitter = SmartTextSplitter(chunk_size=60, chunk_overlap=0)
+
+    csv_chunks = splitter.split_by_file_type("row line\n" * 20, "csv", {"source": "a.csv"})
+    assert len(csv_chunks) > 1
+    assert splitter._splitter_for("xlsx") is splitter._splitter_for("CSV")
+    assert splitter._splitter_for("md") is splitter._splitter_for("md")
+    assert splitter._splitter_for("md") is not splitter._splitter_for("json")
+    assert splitter._splitter_for("txt") is splitter.text_splitter
+    assert set(splitter._splitters) == {"table", "md", "json"}
+
+
+def test_iter_split_documents_matches_split_documents_lazily():
+    splitter = SmartTextSplitter(chunk_size=60, chunk_overlap=0)
+    docs = [
+        Document(page_content="alpha beta gamma. " * 10, metadata={"source": "a.txt"}),
+        Document(page_content="row line\n" * 20, metadata={"source": "b.csv", "file_type": "csv"}),
+    ]
+
+    stream = splitter.iter_split_documents(iter(docs))
+    first = next(stream)
+    assert first.metadata["doc_index"] == 0 and first.metadata["chunk_index"] == 0
+
+    eager = splitter.split_documents(docs)
+    lazy = [first, *stream]
+    assert [(c.page_content, c.metadata) for c in lazy] == [(c.page_content, c.metadata) for c in eager]
+
+
+def test_split_by_file_type_stamps_chunk_metadata():
+    splitter = SmartTextSplitter(chunk_size=60, chunk_overlap=0)
+
+    chunks = splitter.split_by_file_type("alpha beta gamma. " * 10, "txt", {"source": "a.txt"})
+
+    assert len(chunks) > 1
+    assert [c.metadata["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert all(c.metadata["total_chunks"] == len(chunks) for c in chunks)
+    assert all(c.metadata["file_type"] == "txt" and c.metadata["source"] == "a.txt" for c in chunks)
+    assert all(c.metadata["chunk_size"] == len(c.page_content) for c in chunks)
+    assert chunks[0].metadata is not chunks[1].metadata
+
+
+def test_get_chunk_stats_returns_plain_ints():
+    splitter = SmartTextSplitter(chunk_size=100, chunk_overlap=10)
+    docs = [Document(page_content="x" * size) for size in (10, 25, 40)]
+
+    stats = splitter.get_chunk_stats(docs)
+
+    assert stats == {
+        "total_chunks": 3,
+        "avg_chunk_size": 25,
+        "min_chunk_size": 10,
+        "max_chunk_size": 40,
+        "total_size": 75,
+        "overlap_ratio": 0.1,
+    }
+    assert all(type(stats[key]) is int for key in stats if key != "overlap_ratio")
+    assert splitter.get_chunk_stats([])["total_chunks"] == 0
+
+
+def test_split_text_treats_whitespace_only_input_as_empty():
+    splitter = SmartTextSplitter(chunk_size=60, chunk_overlap=0)
+
+    assert splitter.split_text(" \n\t  ") == []
+    assert splitter.split_text("") == []
+    assert splitter.split_text("  word  ") == ["word"]
+
+
+def test_async_splitting_matches_split_documents():
+    splitter = get_splitter(chunk_size=60, chunk_overlap=0)
+    docs = [
+        Document(page_content="alpha beta gamma. " * 10, metadata={"source": "a.txt"}),
+        Document(page_content="row line\n" * 20, metadata={"source": "b.csv", "file_type": "csv"}),
+    ]
+    expected = [(c.page_content, c.metadata) for c in splitter.split_documents(docs)]
+
+    threaded = asyncio.run(splitter.asplit_documents(docs))
+
+    assert [(c.page_content, c.metadata) for c in threaded] == expected
@@ -40,14 +40,15 @@ class _FakeCollection:
                     "id": (ids[idx] if ids else f"{self.name}:{len(self.rows)}"),
                     "document": doc,
                     "metadata": dict(metadatas[idx] or {}),
-                    "embedding": list(embeddings[idx] or []),
+                    "embedding": [float(x) for x in embeddings[idx]],
                 }
             )
 
     add = upsert
 
-    def query(self, *, query_embeddings, n_results, where=None):  # noqa: ANN001
+    def query(self, *, query_embeddings, n_results, where=None, include=None):  # noqa: ANN001
         _ = query_embeddings
+        _ = include
         matched = [row for row in self.rows if _match_where(where, row["metadata"])]
         matched = matched[:n_results]
         return {
@@ -0,0 +1,678 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+import app.rag.vector_store as vector_store_module
+from app.observability.context import request_id_ctx
+from app.rag.vector_store import VectorStoreManager
+
+
+@dataclass
+class _FakeCollection:
+    name: str
+    metadata: Dict[str, Any]
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    write_calls: int = 0
+
+    count_calls: int = 0
+    report_deleted: bool = True
+    last_include: Any = None
+    query_calls: int = 0
+    get_calls: int = 0
+    last_embeddings: Any = None
+    drop_writes: bool = False
+    configuration: Dict[str, Any] = field(default_factory=dict)
+    page_calls: List[Any] = field(default_factory=list)
+
+    def modify(self, *, configuration):  # noqa: ANN001
+        self.configuration.setdefault("hnsw", {}).update(configuration["hnsw"])
+
+    def count(self) -> int:
+        self.count_calls += 1
+        return len(self.rows)
+
+    def delete(self, *, where=None):  # noqa: ANN001
+        kept = [row for row in self.rows if any(row["metadata"].get(k) != v for k, v in (where or {}).items())]
+        deleted = len(self.rows) - len(kept)
+        self.rows = kept
+        return {"deleted": deleted} if self.report_deleted else None
+
+    def query(self, *, query_embeddings, n_results, where=None, include=None, where_document=None):  # noqa: ANN001, ARG002
+        self.last_include = include
+        self.query_calls += 1
+        needle = (where_document or {}).get("$contains")
+        rows = [row for row in self.rows if needle is None or needle in row["document"]][:n_results]
+        batch = range(len(query_embeddings))
+        return {
+            "ids": [[row["id"] for row in rows] for _ in batch],
+            "documents": [[row["document"] for row in rows] for _ in batch],
+            "metadatas": [[row["metadata"] for row in rows] for _ in batch],
+            "distances": [[row["metadata"]["distance"] for row in rows] for _ in batch],
+        }
+
+    def get(self, *, ids=None, include=None, where=None, limit=None, offset=None):  # noqa: ANN001, ARG002
+        self.get_calls += 1
+        if ids is None:
+            self.page_calls.append((limit, offset))
+            matched = [row for row in self.rows if all(row["metadata"].get(k) == v for k, v in (where or {}).items())]
+            page = matched[offset or 0 :][:limit]
+            return {
+                "ids": [row["id"] for row in page],
+                "documents": [row["document"] for row in page],
+                "metadatas": [row["metadata"] for row in page],
+            }
+        stored = {} if self.drop_writes else {row["id"]: row for row in self.rows}
+        found = [doc_id for doc_id in ids or [] if doc_id in stored]
+        result: Dict[str, Any] = {"ids": found}
+        if "embeddings" in (include or []):
+            # Real Chroma returns embeddings as an ndarray.
+            result["embeddings"] = np.asarray([stored[doc_id]["embedding"] for doc_id in found], dtype=np.float32)
+        return result
+
+    def upsert(self, *, documents, metadatas, embeddings, ids=None):  # noqa: ANN001
+        self.write_calls += 1
+        self.last_embeddings = embeddings
+        for idx, document in enumerate(documents):
+            self.rows.append(
+                {
+                    "id": (ids[idx] if ids else f"{self.name}:{len(self.rows)}"),
+                    "document": document,
+                    "metadata": dict(metadatas[idx] or {}),
+                    "embedding": [float(x) for x in embeddings[idx]],
+                }
+            )
+
+
+class _FakePersistentClient:
+    def __init__(self, path: str):  # noqa: ARG002
+        self.collections: Dict[str, _FakeCollection] = {}
+        self.list_calls = 0
+
+    def get_or_create_collection(self, *, name: str, metadata: Dict[str, Any], configuration=None):  # noqa: ANN001
+        if name not in self.collections:
+            self.collections[name] = _FakeCollection(
+                name=name, metadata=dict(metadata or {}), configuration=dict(configuration or {})
+            )
+        return self.collections[name]
+
+    def list_collections(self):
+        self.list_calls += 1
+        return list(self.collections.values())
+
+    def get_collection(self, *, name: str):
+        return self.collections[name]
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path) -> VectorStoreManager:
+    monkeypatch.setattr(VectorStoreManager, "_shared_clients", {})
+    monkeypatch.setattr(vector_store_module, "PersistentClient", _FakePersistentClient)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+    return VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+
+
+def test_sanitize_flat_scalar_metadata_returns_shallow_copy(store):
+    metadata = {"file_id": "f1", "chunk_index": 3, "score": 0.5, "active": True, "sheet": None}
+
+    sanitized = store._sanitize(metadata, mode="storage")
+
+    assert sanitized == metadata
+    assert sanitized is not metadata
+
+
+def test_sanitize_nested_values_still_use_recursive_walker(store):
+    storage = store._sanitize({"file_id": "f1", "tags": ["a", "b"], "raw": b"x"}, mode="storage")
+    assert storage == {"file_id": "f1", "tags": json.dumps(["a", "b"]), "raw": "x"}
+
+    where = store._sanitize({"file_id": {"$in": ["f1", "f2"]}, "user_id": "u1"}, mode="where")
+    assert where == {"file_id": {"$in": ["f1", "f2"]}, "user_id": "u1"}
+
+
+def test_add_documents_writes_one_call_per_collection(store):
+    meta = {"file_id": "f1", "embedding_mode": "local", "embedding_model": "qwen3-emb"}
+    items = [
+        {"content": f"row {idx}", "metadata": dict(meta), "embedding": [0.1, 0.2, 0.3], "doc_id": f"f1_{idx}"}
+        for idx in range(5)
+    ]
+    items.append({"content": "wide", "metadata": dict(meta), "embedding": [0.1] * 4, "doc_id": "f1_wide"})
+
+    written = store.add_documents(items)
+
+    assert written == 6
+    collections = store.client.collections
+    assert len(collections) == 2
+    by_dim = {c.metadata["dimension"]: c for c in collections.values()}
+    assert by_dim[3].write_calls == 1
+    assert [row["id"] for row in by_dim[3].rows] == [f"f1_{idx}" for idx in range(5)]
+    assert all(row["metadata"]["embedding_dimension"] == 3 for row in by_dim[3].rows)
+    assert all(row["metadata"]["collection"] == by_dim[3].name for row in by_dim[3].rows)
+    assert by_dim[4].write_calls == 1
+
+
+def test_query_merges_collections_by_smallest_distance(store):
+    for model, distances in (("model-a", [0.9, 0.2, 0.5]), ("model-b", [0.1, 0.7, 0.3])):
+        store.add_documents(
+            [
+                {
+                    "content": f"{model}-{idx}",
+                    "metadata": {"embedding_mode": "local", "embedding_model": model, "distance": dist},
+                    "embedding": [0.1, 0.2, 0.3],
+                    "doc_id": f"{model}-{idx}",
+                }
+                for idx, dist in enumerate(distances)
+            ]
+        )
+
+    rows = store.query([0.1, 0.2, 0.3], top_k=3)
+    assert [row["distance"] for row in rows] == [0.1, 0.2, 0.3]
+
+    rows = store.query([0.1, 0.2, 0.3], top_k=2, search_all_dimensions=True)
+    assert [row["id"] for row in rows] == ["model-b-0", "model-a-1"]
+
+
+def test_sanitize_json_encoding_is_stable_for_stored_metadata(store):
+    storage = store._sanitize({"sheet": {"name": "Déjà vu"}, "by_row": {1: "a"}}, mode="storage")
+
+    assert storage["sheet"] == '{"name": "Déjà vu"}'
+    assert storage["by_row"] == '{"1": "a"}'
+
+
+def test_ensure_collection_by_dim_reuses_active_collection_without_renaming(store, monkeypatch):
+    first = store._ensure_collection_by_dim(3, embedding_mode="local", embedding_model="qwen3-emb")
+    assert store._ensure_collection([0.1, 0.2, 0.3], embedding_mode="local", embedding_model="qwen3-emb") is first
+
+    def _fail(*args, **kwargs):  # noqa: ANN002, ANN003
+        raise AssertionError("collection name must not be rebuilt for the active collection")
+
+    monkeypatch.setattr(store, "_get_collection_name", _fail)
+    assert store._ensure_collection_by_dim(3, embedding_mode="local", embedding_model="qwen3-emb") is first
+
+
+def test_query_all_dimensions_normalizes_filter_once(store, monkeypatch):
+    for dim in (3, 4):
+        store.add_documents(
+            [{"content": "x", "metadata": {"file_id": "f1", "distance": 0.1}, "embedding": [0.1] * dim, "doc_id": f"d{dim}"}]
+        )
+    calls = []
+    original = store._normalize_where
+
+    def _counting(where):  # noqa: ANN001
+        calls.append(where)
+        return original(where)
+
+    monkeypatch.setattr(store, "_normalize_where", _counting)
+
+    rows = store.query([0.1, 0.2, 0.3], top_k=5, filter_dict={"file_id": "f1"}, search_all_dimensions=True)
+
+    assert [row["id"] for row in rows] == ["d3"]
+    assert len(calls) == 1
+    by_dim = {c.metadata["dimension"]: c for c in store.client.collections.values()}
+    assert by_dim[3].query_calls == 1
+    assert by_dim[4].query_calls == 0
+
+
+def test_collection_registry_is_reused_and_refreshed_on_new_collections(store, tmp_path):
+    store.add_documents([{"content": "x", "metadata": {"distance": 0.1}, "embedding": [0.1] * 3, "doc_id": "d3"}])
+    client = store.client
+
+    store.query([0.1] * 3, top_k=5, search_all_dimensions=True)
+    store.query([0.1] * 3, top_k=5, search_all_dimensions=True)
+    assert client.list_calls == 1
+
+    sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    sibling.add_documents([{"content": "y", "metadata": {"distance": 0.2}, "embedding": [0.1] * 4, "doc_id": "d4"}])
+
+    store.query([0.1] * 3, top_k=5, search_all_dimensions=True)
+    assert client.list_calls == 2
+    assert set(store._all_collections_cache) == set(client.collections)
+
+
+def test_delete_by_metadata_uses_reported_count_without_count_probes(store):
+    meta = {"file_id": "f1", "distance": 0.1}
+    store.add_documents([{"content": f"r{i}", "metadata": dict(meta), "embedding": [0.1] * 3, "doc_id": f"r{i}"} for i in range(3)])
+    collection = next(iter(store.client.collections.values()))
+    collection.count_calls = 0
+
+    assert store.delete_by_metadata({"file_id": "f1"}) == 3
+    assert collection.count_calls == 0
+
+
+def test_delete_by_metadata_counts_only_when_verifying_unreported_deletes(store):
+    meta = {"file_id": "f1", "distance": 0.1}
+    store.add_documents([{"content": f"r{i}", "metadata": dict(meta), "embedding": [0.1] * 3, "doc_id": f"r{i}"} for i in range(4)])
+    collection = next(iter(store.client.collections.values()))
+    collection.report_deleted = False
+    collection.count_calls = 0
+
+    assert store.delete_by_metadata({"file_id": "f1"}) == 0
+    assert collection.count_calls == 0
+
+    store.add_documents([{"content": "r", "metadata": dict(meta), "embedding": [0.1] * 3, "doc_id": "again"}])
+    assert store.delete_by_metadata({"file_id": "f1"}, verify_counts=True) == 1
+
+
+def test_query_requests_only_parsed_fields(store):
+    store.add_documents([{"content": "x", "metadata": {"distance": 0.1}, "embedding": [0.1] * 3, "doc_id": "d3"}])
+
+    store.query([0.1] * 3, top_k=1)
+
+    collection = next(iter(store.client.collections.values()))
+    assert collection.last_include == ["documents", "metadatas", "distances"]
+
+
+def test_query_batch_sends_all_vectors_in_one_call_per_collection(store):
+    meta = {"embedding_mode": "local", "embedding_model": "qwen3-emb"}
+    store.add_documents(
+        [
+            {"content": f"r{i}", "metadata": {**meta, "distance": dist}, "embedding": [0.1] * 3, "doc_id": f"r{i}"}
+            for i, dist in enumerate([0.4, 0.1, 0.3])
+        ]
+    )
+    collection = next(iter(store.client.collections.values()))
+
+    results = store.query_batch([[0.1] * 3, [0.2] * 3], top_k=2, filter_dict=meta)
+
+    assert collection.query_calls == 1
+    assert len(results) == 2
+    assert all([row["id"] for row in rows] == ["r0", "r1"] for rows in results)
+
+    merged = store.query_batch([[0.1] * 3, [0.2] * 3], top_k=2)
+    assert [[row["id"] for row in rows] for rows in merged] == [["r1", "r0"], ["r1", "r0"]]
+    assert store.query_batch([]) == []
+    with pytest.raises(ValueError):
+        store.query_batch([[0.1] * 3, [0.1] * 4])
+
+
+def test_sanitize_keeps_scalar_subclasses_in_nested_payloads(store):
+    class _Kind(str):
+        pass
+
+    where = store._sanitize({"file_id": {"$in": [_Kind("f1"), "f2"]}}, mode="where")
+
+    assert where == {"file_id": {"$in": ["f1", "f2"]}}
+    assert type(where["file_id"]["$in"][0]) is _Kind
+
+
+def test_parse_results_stops_at_shortest_column(store):
+    raw = {
+        "ids": [["a", "b", "c"]],
+        "documents": [["A", "B"]],
+        "metadatas": [[None, {"k": 1}, {}]],
+        "distances": [[0.1, 0.2, 0.3]],
+    }
+
+    assert store._parse_results(raw) == [
+        {"id": "a", "content": "A", "metadata": {}, "distance": 0.1},
+        {"id": "b", "content": "B", "metadata": {"k": 1}, "distance": 0.2},
+    ]
+    assert store._parse_results(raw, index=1) == []
+
+
+def test_add_documents_splits_large_groups_into_bounded_writes(store):
+    items = [
+        {"content": f"row {idx}", "metadata": {"file_id": "f1"}, "embedding": [0.1, 0.2, 0.3], "doc_id": f"f1_{idx}"}
+        for idx in range(7)
+    ]
+
+    assert store.add_documents(items, max_batch_size=3) == 7
+
+    collection = next(iter(store.client.collections.values()))
+    assert collection.write_calls == 3
+    assert [row["id"] for row in collection.rows] == [f"f1_{idx}" for idx in range(7)]
+
+
+def test_add_documents_verifies_with_one_get_per_slice_only_when_requested(store):
+    items = [
+        {"content": f"row {idx}", "metadata": {"file_id": "f1"}, "embedding": [0.1, 0.2, 0.3], "doc_id": f"f1_{idx}"}
+        for idx in range(4)
+    ]
+
+    assert store.add_documents(items[:2]) == 2
+    collection = next(iter(store.client.collections.values()))
+    assert collection.get_calls == 0
+
+    assert store.add_documents(items, max_batch_size=2, verify=True) == 4
+    assert collection.get_calls == 2
+
+    collection.drop_writes = True
+    assert store.add_documents(items, verify=True) == 0
+
+
+def test_collection_count_is_cached_across_managers_until_written(store, tmp_path):
+    store.add_documents([{"content": "x", "metadata": {"file_id": "f1"}, "embedding": [0.1] * 3, "doc_id": "d1"}])
+    collection = next(iter(store.client.collections.values()))
+    collection.count_calls = 0
+
+    for _ in range(3):
+        sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+        sibling._ensure_collection_by_dim(3)
+    assert collection.count_calls == 1
+
+    store.add_documents([{"content": "y", "metadata": {"file_id": "f1"}, "embedding": [0.1] * 3, "doc_id": "d2"}])
+    sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    sibling._ensure_collection_by_dim(3)
+    assert collection.count_calls == 2
+
+
+def test_collection_name_is_memoized_and_dimension_parsed_back(store, monkeypatch):
+    name = store._get_collection_name(1024, embedding_mode="local", embedding_model="qwen3-emb")
+
+    def _fail(*args, **kwargs):  # noqa: ANN002, ANN003
+        raise AssertionError("identity hash must not be recomputed")
+
+    monkeypatch.setattr(vector_store_module, "sha1", _fail)
+    assert store._get_collection_name(1024, embedding_mode="local", embedding_model="qwen3-emb") == name
+    assert store._extract_dimension_from_name(name) == 1024
+    assert store._extract_dimension_from_name("documents_768d") == 768
+    assert store._extract_dimension_from_name("documents_misc") is None
+
+
+def test_fan_out_queries_collections_concurrently(store):
+    for model in ("model-a", "model-b"):
+        store.add_documents(
+            [
+                {
+                    "content": model,
+                    "metadata": {"embedding_mode": "local", "embedding_model": model, "distance": 0.1},
+                    "embedding": [0.1] * 3,
+                    "doc_id": model,
+                }
+            ]
+        )
+    barrier = threading.Barrier(2, timeout=5)
+    seen_request_ids: List[Any] = []
+    for collection in store.client.collections.values():
+        original = collection.query
+
+        def _query(*, _original=original, **kwargs):  # noqa: ANN003
+            barrier.wait()  # both collections must be in flight at the same time
+            seen_request_ids.append(request_id_ctx.get())
+            return _original(**kwargs)
+
+        collection.query = _query
+
+    token = request_id_ctx.set("rid-1")
+    try:
+        rows = store.query([0.1] * 3, top_k=5)
+    finally:
+        request_id_ctx.reset(token)
+
+    assert {row["id"] for row in rows} == {"model-a", "model-b"}
+    assert seen_request_ids == ["rid-1", "rid-1"]
+
+
+def test_query_forwards_where_document_to_chroma(store):
+    store.add_documents(
+        [
+            {"content": text, "metadata": {"distance": dist}, "embedding": [0.1] * 3, "doc_id": text}
+            for text, dist in (("invoice total", 0.2), ("shipping note", 0.1))
+        ]
+    )
+
+    rows = store.query([0.1] * 3, top_k=5, where_document={"$contains": "invoice"})
+    assert [row["id"] for row in rows] == ["invoice total"]
+
+    rows = store.query([0.1] * 3, top_k=5, search_all_dimensions=True, where_document={"$contains": "note"})
+    assert [row["id"] for row in rows] == ["shipping note"]
+
+    batch = store.query_batch([[0.1] * 3], top_k=5, where_document={"$contains": "invoice"})
+    assert [[row["id"] for row in rows] for rows in batch] == [["invoice total"]]
+
+
+def test_embeddings_cross_the_chroma_boundary_as_float32_matrices(store):
+    store.add_documents([{"content": "x", "metadata": {}, "embedding": [0.1, 0.2, 0.3], "doc_id": f"d{i}"} for i in range(2)])
+
+    collection = next(iter(store.client.collections.values()))
+    assert isinstance(collection.last_embeddings, np.ndarray)
+    assert collection.last_embeddings.dtype == np.float32
+    assert collection.last_embeddings.shape == (2, 3)
+
+
+def test_prefix_index_searches_truncated_vectors_and_reranks_with_full_ones(monkeypatch, tmp_path):
+    monkeypatch.setattr(VectorStoreManager, "_shared_clients", {})
+    monkeypatch.setattr(vector_store_module, "PersistentClient", _FakePersistentClient)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+    store = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path), index_dim=2)
+    identity = {"embedding_mode": "local", "embedding_model": "m"}
+    store.add_documents(
+        [
+            {"content": doc_id, "metadata": {**identity, "distance": 0.0}, "embedding": vector, "doc_id": doc_id}
+            for doc_id, vector in (("far", [1.0, 0.0, 5.0]), ("near", [1.0, 0.0, 0.5]), ("mid", [0.0, 1.0, 0.0]))
+        ]
+    )
+
+    prefix = next(c for name, c in store.client.collections.items() if name.endswith("_mrl2"))
+    full = next(c for name, c in store.client.collections.items() if not name.endswith("_mrl2"))
+    assert [row["embedding"] for row in prefix.rows] == [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+
+    rows = store.query([1.0, 0.0, 0.0], top_k=2, filter_dict=identity)
+
+    assert prefix.query_calls == 1 and full.query_calls == 0
+    assert [row["id"] for row in rows] == ["near", "mid"]
+    assert rows[0]["distance"] == pytest.approx(0.25)
+    assert [row["id"] for row in store.query([1.0, 0.0, 0.0], top_k=5)] == ["far", "near", "mid"]
+
+
+def test_prefix_index_write_failure_keeps_full_write_result(monkeypatch, tmp_path):
+    monkeypatch.setattr(VectorStoreManager, "_shared_clients", {})
+    monkeypatch.setattr(vector_store_module, "PersistentClient", _FakePersistentClient)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+    store = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path), index_dim=2)
+
+    def _broken_prefix_collection(*args, **kwargs):  # noqa: ANN002, ANN003
+        raise RuntimeError("prefix index unavailable")
+
+    monkeypatch.setattr(store._prefix_index, "_ensure_collection", _broken_prefix_collection)
+    identity = {"embedding_mode": "local", "embedding_model": "m"}
+
+    written = store.add_documents(
+        [{"content": "a", "metadata": identity, "embedding": [1.0, 0.0, 0.0], "doc_id": "a"}]
+    )
+
+    assert written == 1
+    assert store.add_document(content="b", metadata=identity, embedding=[0.0, 1.0, 0.0], doc_id="b")
+    (full,) = store.client.collections.values()
+    assert [row["id"] for row in full.rows] == ["a", "b"]
+
+
+def test_concurrent_writers_get_their_own_collection_created_once(store, monkeypatch):
+    created: List[str] = []
+    original = store.client.get_or_create_collection
+
+    def _get_or_create(*, name, metadata):  # noqa: ANN001
+        created.append(name)
+        return original(name=name, metadata=metadata)
+
+    monkeypatch.setattr(store.client, "get_or_create_collection", _get_or_create)
+    barrier = threading.Barrier(8, timeout=5)
+
+    def _write(idx: int) -> None:
+        dim = 3 if idx % 2 else 4
+        barrier.wait()
+        assert store.add_document(content=f"d{idx}", metadata={}, embedding=[0.1] * dim, doc_id=f"d{idx}")
+
+    threads = [threading.Thread(target=_write, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(created) == ["documents_3d", "documents_4d"]
+    for name, collection in store.client.collections.items():
+        dim = store._extract_dimension_from_name(name)
+        assert all(len(row["embedding"]) == dim for row in collection.rows)
+        assert len(collection.rows) == 4
+
+
+def test_registry_listing_warms_collection_cache_without_extra_round_trips(store, tmp_path, monkeypatch):
+    store.add_documents([{"content": "x", "metadata": {"distance": 0.1}, "embedding": [0.1] * 3, "doc_id": "d3"}])
+    sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    client = sibling.client
+
+    def _fail(**kwargs):  # noqa: ANN003
+        raise AssertionError(f"unexpected round-trip: {kwargs}")
+
+    monkeypatch.setattr(client, "get_collection", _fail)
+    assert [row["id"] for row in sibling.query([0.1] * 3, top_k=5, search_all_dimensions=True)] == ["d3"]
+
+    monkeypatch.setattr(client, "get_or_create_collection", _fail)
+    assert sibling._ensure_collection_by_dim(3) is client.collections["documents_3d"]
+
+
+def test_async_entry_points_run_off_the_event_loop_thread(store, monkeypatch):
+    callers: List[str] = []
+    original = store.add_documents
+
+    def _add_documents(items, **kwargs):  # noqa: ANN001, ANN003
+        callers.append(threading.current_thread().name)
+        return original(items, **kwargs)
+
+    monkeypatch.setattr(store, "add_documents", _add_documents)
+    items = [{"content": "x", "metadata": {"file_id": "f1", "distance": 0.1}, "embedding": [0.1] * 3, "doc_id": "d1"}]
+
+    async def _run():
+        written = await store.aadd_documents(items, max_batch_size=10)
+        rows = await store.aquery([0.1] * 3, top_k=5)
+        deleted = await store.adelete_by_metadata({"file_id": "f1"})
+        return written, rows, deleted
+
+    written, rows, deleted = asyncio.run(_run())
+
+    assert (written, [row["id"] for row in rows], deleted) == (1, ["d1"], 1)
+    assert callers and callers[0] != threading.main_thread().name
+
+
+def test_query_logs_filter_fingerprint_instead_of_filter_values(store, caplog):
+    conversation_ids = [f"conversation-{idx}" for idx in range(200)]
+
+    with caplog.at_level("INFO", logger=vector_store_module.logger.name):
+        store.query([0.1] * 3, top_k=5, filter_dict={"conversation_id": {"$in": conversation_ids}, "user_id": "u1"})
+
+    line = next(record.getMessage() for record in caplog.records if record.getMessage().startswith("Query:"))
+    assert "conversation-0" not in line
+    fingerprint = str(vector_store_module._FilterFingerprint({"user_id": "u1", "conversation_id": {"$in": conversation_ids}}))
+    assert line.endswith(f"filter={fingerprint}")
+    assert fingerprint.endswith("[conversation_id,user_id]")
+    assert str(vector_store_module._FilterFingerprint(None)) == "-"
+
+
+def test_repeated_query_is_served_from_result_cache_until_next_write(store, tmp_path):
+    store.add_documents([{"content": "a", "metadata": {"distance": 0.2}, "embedding": [0.1] * 3, "doc_id": "a"}])
+    collection = next(iter(store.client.collections.values()))
+
+    first = store.query([0.1] * 3, top_k=5, filter_dict={"file_id": {"$in": ["f1"]}})
+    first[0]["metadata"]["annotated"] = True
+    second = store.query([0.1] * 3, top_k=5, filter_dict={"file_id": {"$in": ["f1"]}})
+    assert collection.query_calls == 1
+    assert "annotated" not in second[0]["metadata"]
+
+    store.query([0.1] * 3, top_k=4, filter_dict={"file_id": {"$in": ["f1"]}})
+    assert collection.query_calls == 2
+
+    sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    sibling.add_documents([{"content": "b", "metadata": {"distance": 0.1}, "embedding": [0.1] * 3, "doc_id": "b"}])
+    rows = store.query([0.1] * 3, top_k=5, filter_dict={"file_id": {"$in": ["f1"]}})
+    assert collection.query_calls == 3
+    assert [row["id"] for row in rows] == ["b", "a"]
+
+
+def test_near_duplicate_query_reuses_semantic_cache_entry(monkeypatch, tmp_path):
+    monkeypatch.setattr(VectorStoreManager, "_shared_clients", {})
+    monkeypatch.setattr(vector_store_module, "PersistentClient", _FakePersistentClient)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_SEMANTIC_CACHE_THRESHOLD", 0.99)
+    store = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    store.add_documents([{"content": "a", "metadata": {"distance": 0.2}, "embedding": [0.1] * 3, "doc_id": "a"}])
+    collection = next(iter(store.client.collections.values()))
+
+    first = store.query([0.1, 0.1, 0.1], top_k=5)
+    near = store.query([0.1, 0.1, 0.1001], top_k=5)
+    assert collection.query_calls == 1
+    assert near == first and near[0] is not first[0]
+
+    store.query([0.1, 0.1, 0.1001], top_k=4)
+    store.query([0.1, -0.1, 0.1], top_k=5)
+    assert collection.query_calls == 3
+
+
+def test_existing_collection_is_opened_with_plain_get(store, tmp_path, monkeypatch):
+    store.add_documents([{"content": "x", "metadata": {}, "embedding": [0.1] * 3, "doc_id": "d3"}])
+    sibling = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+
+    def _fail(**kwargs):  # noqa: ANN003
+        raise AssertionError(f"existing collection must not be re-created: {kwargs}")
+
+    monkeypatch.setattr(sibling.client, "get_or_create_collection", _fail)
+    assert sibling._ensure_collection_by_dim(3) is sibling.client.collections["documents_3d"]
+
+
+def test_add_documents_caps_slices_at_client_max_batch_size(store, monkeypatch):
+    monkeypatch.setattr(store.client, "get_max_batch_size", lambda: 4, raising=False)
+    items = [{"content": f"r{idx}", "metadata": {}, "embedding": [0.1] * 3, "doc_id": f"r{idx}"} for idx in range(10)]
+
+    assert store.add_documents(items) == 10
+
+    collection = next(iter(store.client.collections.values()))
+    assert collection.write_calls == 3
+
+
+def test_hnsw_settings_apply_to_new_collections_and_ef_search_is_tunable(store, monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_HNSW_M", 24)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_HNSW_CONSTRUCTION_EF", 128)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_HNSW_SEARCH_EF", 0)
+
+    collection = store._ensure_collection_by_dim(3)
+    assert collection.configuration == {"hnsw": {"max_neighbors": 24, "ef_construction": 128}}
+
+    assert store.set_search_ef(100) == 1
+    assert collection.configuration["hnsw"]["ef_search"] == 100
+    with pytest.raises(ValueError):
+        store.set_search_ef(0)
+
+
+def test_get_by_filter_pages_each_collection(store, monkeypatch):
+    monkeypatch.setattr(VectorStoreManager, "_GET_PAGE_SIZE", 2)
+    meta = {"file_id": "f1", "embedding_mode": "local", "embedding_model": "qwen3-emb"}
+    store.add_documents(
+        [{"content": f"row {idx}", "metadata": dict(meta), "embedding": [0.1, 0.2], "doc_id": f"f1_{idx}"} for idx in range(5)]
+    )
+    (collection,) = store.client.collections.values()
+
+    stream = store.iter_by_filter(filter_dict={"file_id": "f1"}, limit_per_collection=None)
+    assert next(stream)["id"] == "f1_0"
+    assert collection.page_calls == [(2, None)]
+    assert [row["id"] for row in stream] == [f"f1_{idx}" for idx in range(1, 5)]
+    assert collection.page_calls == [(2, None), (2, 2), (2, 4)]
+
+    collection.page_calls.clear()
+    rows = store.get_by_filter(filter_dict={"file_id": "f1"}, limit_per_collection=3)
+    assert [row["content"] for row in rows] == ["row 0", "row 1", "row 2"]
+    assert collection.page_calls == [(2, None), (1, 2)]
+
+
+def test_run_search_uses_bounded_pool_and_keeps_context(monkeypatch):
+    import contextvars
+
+    monkeypatch.setattr(vector_store_module, "_search_pool", None)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_SEARCH_WORKERS", 2)
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    def _probe(value, *, suffix):  # noqa: ANN001
+        return threading.current_thread().name, f"{request_id.get()}:{value}{suffix}"
+
+    async def _run():
+        request_id.set("rid-1")
+        return await vector_store_module.run_search(_probe, "q", suffix="!")
+
+    thread_name, seen = asyncio.run(_run())
+
+    assert thread_name.startswith("chroma-search") and seen == "rid-1:q!"
+    assert vector_store_module._search_pool._max_workers == 2
+    vector_store_module._search_pool.shutdown(wait=True)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import logging
+import sys
+import types
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
@@ -32,9 +34,10 @@ class _FakeCollection:
 
     add = upsert
 
-    def query(self, *, query_embeddings, n_results, where=None):  # noqa: ANN001
+    def query(self, *, query_embeddings, n_results, where=None, include=None):  # noqa: ANN001
         _ = query_embeddings
         _ = where
+        _ = include
         matched = list(self.rows[:n_results])
         return {
             "ids": [[row["id"] for row in matched]],
@@ -171,3 +174,43 @@ def test_failure_logging_includes_recovery_hint(monkeypatch: pytest.MonkeyPatch,
     joined = " ".join(record.getMessage() for record in caplog.records)
     assert "persist_directory" in joined
     assert "VECTORDB_EPHEMERAL_MODE=true" in joined
+
+
+def test_chromadb_client_class_is_resolved_on_first_client_build(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    _reset_shared_clients(monkeypatch)
+    _TrackingPersistentClient.created_paths = []
+    fake_chromadb = types.ModuleType("chromadb")
+    fake_chromadb.PersistentClient = _TrackingPersistentClient
+    fake_chromadb.EphemeralClient = _TrackingEphemeralClient
+    monkeypatch.setitem(sys.modules, "chromadb", fake_chromadb)
+    monkeypatch.setattr(vector_store_module, "PersistentClient", None)
+    monkeypatch.setattr(vector_store_module, "EphemeralClient", None)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+
+    store = VectorStoreManager(base_collection_name="documents", persist_directory=str(tmp_path))
+    assert vector_store_module.PersistentClient is None
+
+    _ = store.client
+
+    assert vector_store_module.PersistentClient is _TrackingPersistentClient
+    assert _TrackingPersistentClient.created_paths == [str(tmp_path)]
+
+
+def test_default_manager_is_shared_and_defers_persist_dir_creation(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    _reset_shared_clients(monkeypatch)
+    _TrackingPersistentClient.created_paths = []
+    persist_dir = tmp_path / "vectordb"
+    monkeypatch.setattr(vector_store_module, "PersistentClient", _TrackingPersistentClient)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_EPHEMERAL_MODE", False)
+    monkeypatch.setattr(vector_store_module.settings, "VECTORDB_PATH", str(persist_dir))
+    monkeypatch.setattr(vector_store_module, "_default_manager", None)
+
+    store = vector_store_module.get_vectorstore_manager()
+    assert store is vector_store_module.get_vectorstore_manager()
+    assert store.persist_directory == str(persist_dir)
+    assert not persist_dir.exists()
+
+    _ = store.client
+
+    assert persist_dir.is_dir()
+    assert _TrackingPersistentClient.created_paths == [str(persist_dir)]